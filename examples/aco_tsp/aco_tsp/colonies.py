@@ -0,0 +1,142 @@
+"""Run several independent ant colonies in parallel.
+
+Every colony is an ``AcoTspModel`` with its own seed and parameters, running in its own
+process. Every ``migration_interval`` steps the colonies publish their best tour in shared
+memory, wait for each other, and deposit extra pheromone along the tours of the others.
+"""
+
+import multiprocessing as mp
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .model import AcoTspModel, TSPGraph
+
+
+def _run_colony(
+    index,
+    tsp_graph,
+    model_params,
+    num_steps,
+    migration_interval,
+    migration_q,
+    shared_tours,
+    shared_distances,
+    barrier,
+    results,
+):
+    try:
+        model = AcoTspModel(tsp_graph=tsp_graph, **model_params)
+        tours = np.frombuffer(shared_tours, dtype=np.int64).reshape(
+            -1, tsp_graph.num_cities
+        )
+        distances = np.frombuffer(shared_distances, dtype=np.float64)
+
+        history = []
+        for step in range(1, num_steps + 1):
+            model.step()
+            if step % migration_interval == 0:
+                tours[index] = model.best_tour
+                distances[index] = model.best_distance
+                barrier.wait()
+                for other in range(len(distances)):
+                    if other == index:
+                        continue
+                    tour = tours[other]
+                    tsp_graph.deposit(
+                        tour[:-1], tour[1:], migration_q / distances[other]
+                    )
+                    if distances[other] < model.best_distance:
+                        model.best_distance = float(distances[other])
+                        model.best_path = tsp_graph.labels(tour)
+                        model.best_tour = tour.copy()
+                # Nobody may publish the next tour before everyone has read this one
+                barrier.wait()
+            history.append(model.best_distance)
+    except Exception as e:
+        barrier.abort()
+        results.put((index, e))
+    else:
+        results.put((index, (history, model.best_distance, model.best_path)))
+
+
+def run_colonies(
+    tsp_graph: TSPGraph,
+    colony_params: list[dict] | None = None,
+    num_steps: int = 50,
+    migration_interval: int = 10,
+    migration_q: float = 100,
+    **model_params,
+) -> dict:
+    """Run one ``AcoTspModel`` per entry of ``colony_params`` in parallel processes.
+
+    Args:
+        tsp_graph: The TSP instance all colonies solve.
+        colony_params: Per-colony model parameters (e.g. ``seed``, ``ant_alpha``,
+            ``ant_beta``), overriding ``model_params``. Defaults to one colony per CPU
+            core, seeded ``0, 1, ...``.
+        num_steps: Number of steps every colony runs.
+        migration_interval: Steps between two exchanges of best tours.
+        migration_q: Pheromone ``Q`` deposited along a migrated tour of length ``L``
+            as ``Q / L`` per edge.
+        **model_params: Parameters shared by all colonies.
+
+    Returns:
+        A dict with the merged convergence ``history`` (a DataFrame with the best
+        distance of every colony and the overall ``best_distance`` per step) and the
+        overall ``best_distance`` and ``best_path``.
+    """
+    if colony_params is None:
+        colony_params = [{"seed": seed} for seed in range(os.cpu_count() or 1)]
+    num_colonies = len(colony_params)
+
+    # Every colony must be running at once to meet at the barrier, hence one process each
+    shared_tours = mp.RawArray("q", num_colonies * tsp_graph.num_cities)
+    shared_distances = mp.RawArray("d", num_colonies)
+    barrier = mp.Barrier(num_colonies)
+    results = mp.Queue()
+    processes = [
+        mp.Process(
+            target=_run_colony,
+            args=(
+                index,
+                tsp_graph,
+                {**model_params, **params},
+                num_steps,
+                migration_interval,
+                migration_q,
+                shared_tours,
+                shared_distances,
+                barrier,
+                results,
+            ),
+        )
+        for index, params in enumerate(colony_params)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = dict(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+
+    failures = [e for e in outcomes.values() if isinstance(e, Exception)]
+    if failures:
+        # Colonies stuck at the aborted barrier only report the original failure
+        raise next(
+            (e for e in failures if not isinstance(e, threading.BrokenBarrierError)),
+            failures[0],
+        )
+
+    history = pd.DataFrame(
+        {f"colony_{index}": outcomes[index][0] for index in range(num_colonies)},
+        index=pd.RangeIndex(1, num_steps + 1, name="step"),
+    )
+    history["best_distance"] = history.min(axis=1)
+    best = min(outcomes.values(), key=lambda outcome: outcome[1])
+    return {
+        "history": history,
+        "best_distance": best[1],
+        "best_path": best[2],
+    }
@@ -0,0 +1,195 @@
+"""2-opt and Or-opt local search for ant tours.
+
+Tours are open paths of city indices into a ``TSPGraph``, as built by the ants. They are
+improved as a cycle through a virtual depot (index ``-1``) that is at zero distance from
+every city, so moves touching either end of the path need no special casing. On graphs
+with candidate lists only moves that create an edge to a candidate are evaluated.
+"""
+
+import time
+
+import numpy as np
+
+DEPOT = -1
+EPSILON = 1e-9
+
+
+def path_length(tsp_graph, tour) -> float:
+    """Length of the open path ``tour``."""
+    return float(tsp_graph.distance_between(tour[:-1], tour[1:]).sum())
+
+
+def _distance(tsp_graph, i, j) -> np.ndarray:
+    i, j = np.broadcast_arrays(i, j)
+    distance = tsp_graph.distance_between(np.maximum(i, 0), np.maximum(j, 0))
+    return np.where((i == DEPOT) | (j == DEPOT), 0.0, distance)
+
+
+def _positions(tsp_graph, cycle) -> np.ndarray:
+    # One extra slot so the depot (-1) lands in the last entry
+    positions = np.empty(tsp_graph.num_cities + 1, dtype=np.intp)
+    positions[cycle] = np.arange(cycle.size)
+    return positions
+
+
+def _to_path(cycle) -> np.ndarray:
+    depot = np.flatnonzero(cycle == DEPOT)[0]
+    return np.concatenate([cycle[depot + 1 :], cycle[:depot]])
+
+
+def _expired(deadline) -> bool:
+    return deadline is not None and time.perf_counter() > deadline
+
+
+def two_opt(tsp_graph, tour, deadline: float | None = None) -> np.ndarray:
+    """Apply improving 2-opt moves until none is left or ``deadline`` has passed.
+
+    Args:
+        tsp_graph: The ``TSPGraph`` the tour is defined on.
+        tour: Open path of city indices.
+        deadline: ``time.perf_counter()`` value after which to stop early.
+
+    Returns:
+        The improved open path.
+    """
+    cycle = np.append(np.asarray(tour, dtype=np.intp), DEPOT)
+    size = cycle.size
+    edges = _distance(tsp_graph, cycle, np.roll(cycle, -1))
+    positions = _positions(tsp_graph, cycle)
+
+    improved = True
+    while improved and not _expired(deadline):
+        improved = False
+        for i in range(size - 2):
+            if _expired(deadline):
+                break
+            # Remove (c[i], c[i+1]) and (c[j], c[j+1]), add (c[i], c[j]) and
+            # (c[i+1], c[j+1]) by reversing c[i+1..j]
+            last = size - 1 if i > 0 else size - 2
+            if tsp_graph.candidates is None or cycle[i] == DEPOT:
+                j = np.arange(i + 2, last + 1)
+            else:
+                j = positions[tsp_graph.candidates[cycle[i]]]
+                j = j[(j >= i + 2) & (j <= last)]
+            if j.size == 0:
+                continue
+
+            following = cycle[(j + 1) % size]
+            gain = (
+                edges[i]
+                + edges[j]
+                - _distance(tsp_graph, cycle[i], cycle[j])
+                - _distance(tsp_graph, cycle[i + 1], following)
+            )
+            best = np.argmax(gain)
+            if gain[best] <= EPSILON:
+                continue
+
+            j = j[best]
+            cycle[i + 1 : j + 1] = cycle[i + 1 : j + 1][::-1]
+            edges[i + 1 : j] = edges[i + 1 : j][::-1]
+            edges[i] = _distance(tsp_graph, cycle[i], cycle[i + 1])
+            edges[j] = _distance(tsp_graph, cycle[j], cycle[(j + 1) % size])
+            positions[cycle[i + 1 : j + 1]] = np.arange(i + 1, j + 1)
+            improved = True
+
+    return _to_path(cycle)
+
+
+def or_opt(
+    tsp_graph, tour, deadline: float | None = None, max_segment: int = 3
+) -> np.ndarray:
+    """Move segments of up to ``max_segment`` cities to a better place in the tour.
+
+    Segments may be reinserted in either direction. Stops when no improving move is
+    left or ``deadline`` has passed.
+
+    Args:
+        tsp_graph: The ``TSPGraph`` the tour is defined on.
+        tour: Open path of city indices.
+        deadline: ``time.perf_counter()`` value after which to stop early.
+        max_segment: Longest segment to move.
+
+    Returns:
+        The improved open path.
+    """
+    cycle = np.append(np.asarray(tour, dtype=np.intp), DEPOT)
+    size = cycle.size
+
+    improved = True
+    while improved and not _expired(deadline):
+        improved = False
+        positions = _positions(tsp_graph, cycle)
+        for length in range(1, max_segment + 1):
+            i = 0
+            # The segment c[i+1..i+length] sits between c[i] and c[i+length+1]
+            while i < size - length - 1:
+                if _expired(deadline):
+                    break
+                first, last = cycle[i + 1], cycle[i + length]
+                after = cycle[i + length + 1]
+                removal = (
+                    _distance(tsp_graph, cycle[i], first)
+                    + _distance(tsp_graph, last, after)
+                    - _distance(tsp_graph, cycle[i], after)
+                )
+                if removal <= EPSILON:
+                    i += 1
+                    continue
+
+                # Candidate insertions between c[p] and c[p+1]
+                if tsp_graph.candidates is None or DEPOT in (first, last):
+                    p = np.arange(size)
+                else:
+                    near = positions[tsp_graph.candidates[[first, last]].ravel()]
+                    p = np.unique(np.concatenate([near, near - 1]) % size)
+                p = p[(p < i) | (p > i + length)]
+                if p.size == 0:
+                    i += 1
+                    continue
+
+                before, behind = cycle[p], cycle[(p + 1) % size]
+                base = _distance(tsp_graph, before, behind)
+                forward = (
+                    _distance(tsp_graph, before, first)
+                    + _distance(tsp_graph, last, behind)
+                    - base
+                )
+                backward = (
+                    _distance(tsp_graph, before, last)
+                    + _distance(tsp_graph, first, behind)
+                    - base
+                )
+                cost = np.minimum(forward, backward)
+                best = np.argmin(cost)
+                if removal - cost[best] <= EPSILON:
+                    i += 1
+                    continue
+
+                segment = cycle[i + 1 : i + length + 1]
+                if backward[best] < forward[best]:
+                    segment = segment[::-1]
+                rest = np.concatenate([cycle[: i + 1], cycle[i + length + 1 :]])
+                insert = p[best] + 1 if p[best] < i else p[best] + 1 - length
+                cycle = np.concatenate([rest[:insert], segment, rest[insert:]])
+                positions = _positions(tsp_graph, cycle)
+                improved = True
+                i += 1
+
+    return _to_path(cycle)
+
+
+METHODS = {
+    "2-opt": (two_opt,),
+    "or-opt": (or_opt,),
+    "2-opt+or-opt": (two_opt, or_opt),
+}
+
+
+def improve(
+    tsp_graph, tour, method: str = "2-opt", deadline: float | None = None
+) -> np.ndarray:
+    """Run the local search ``method`` (a key of ``METHODS``) on ``tour``."""
+    for search in METHODS[method]:
+        tour = search(tsp_graph, tour, deadline=deadline)
+    return tour
@@ -1,27 +1,54 @@
-from dataclasses import dataclass
+import itertools
+import time
 
 import mesa
 import networkx as nx
 import numpy as np
 from mesa.discrete_space import CellAgent, Network
+from scipy.spatial import KDTree
 
+from .local_search import METHODS, improve, path_length
+from .pheromone import AntSystem
+from .tsplib import read_tsplib
 
-@dataclass
-class NodeCoordinates:
-    city: int
-    x: float
-    y: float
 
-    @classmethod
-    def from_line(cls, line: str):
-        city, x, y = line.split()
-        return cls(int(city), float(x), float(y))
+class TSPGraph:
+    """A TSP instance backed by NumPy arrays.
 
+    The networkx graph ``g`` is kept as a read-only view of the instance (for the
+    ``Network`` space and visualization). By default ``distance``, ``visibility`` and
+    ``pheromone`` are dense ``NxN`` matrices: row/column ``i`` refers to the node
+    ``nodes[i]`` and non-edges have a visibility and pheromone of zero so they are
+    never chosen.
 
-class TSPGraph:
-    def __init__(self, g: nx.Graph, pheromone_init: float = 1e-6):
+    With ``candidate_k`` set, only the ``k`` nearest neighbours of every city are
+    kept. ``candidates`` is then an ``(N, k)`` array of city indices and the three
+    arrays are ``(N, k)`` as well, column ``s`` of row ``i`` describing the edge
+    ``i -> candidates[i, s]``. Use ``slots`` to find the column of an edge.
+
+    Distances are Euclidean between the ``pos`` of the nodes, unless a ``metric``
+    function of two coordinate arrays or an explicit ``NxN`` ``weights`` matrix is given.
+    """
+
+    def __init__(
+        self,
+        g: nx.Graph,
+        pheromone_init: float = 1e-6,
+        candidate_k: int | None = None,
+        metric=None,
+        weights: np.ndarray | None = None,
+    ):
         self.g = g
         self.pheromone_init = pheromone_init
+        self.candidate_k = candidate_k
+        self.metric = metric
+        self.weights = weights
+        self.nodes = list(g.nodes)
+        self.node_index = {node: idx for idx, node in enumerate(self.nodes)}
+        self._node_array = np.empty(len(self.nodes), dtype=object)
+        self._node_array[:] = self.nodes
+        self.coordinates = np.array([g.nodes[node]["pos"] for node in self.nodes])
+        self.symmetric = not g.is_directed()
         self._add_edge_properties()
 
     @property
@@ -37,45 +64,215 @@ class TSPGraph:
         return len(self.g.nodes)
 
     def _add_edge_properties(self):
-        for u, v in self.g.edges():
-            u_x, u_y = self.g.nodes[u]["pos"]
-            v_x, v_y = self.g.nodes[v]["pos"]
-            self.g[u][v]["distance"] = ((u_x - v_x) ** 2 + (u_y - v_y) ** 2) ** 0.5
-            self.g[u][v]["visibility"] = 1 / self.g[u][v]["distance"]
-            self.g[u][v]["pheromone"] = self.pheromone_init
+        if self.candidate_k is None:
+            self.candidates = None
+            self.adjacency = (
+                nx.to_numpy_array(self.g, nodelist=self.nodes, weight=None) > 0
+            )
+            cities = np.arange(self.num_cities)
+            self.distance = self._metric(cities[:, np.newaxis], cities[np.newaxis, :])
+        else:
+            self.candidates = self._nearest_neighbors(self.candidate_k)
+            # Keep every row sorted by city so edges can be looked up by bisection
+            self.candidates.sort(axis=1)
+            self._candidate_keys = (
+                np.arange(self.num_cities)[:, np.newaxis] * self.num_cities
+                + self.candidates
+            ).ravel()
+            self.adjacency = np.ones(self.candidates.shape, dtype=bool)
+            self.distance = self._metric(
+                np.arange(self.num_cities)[:, np.newaxis], self.candidates
+            )
 
-    @classmethod
-    def from_random(cls, num_cities: int, seed: int = 0) -> "TSPGraph":
-        g = nx.random_geometric_graph(num_cities, 2.0, seed=seed).to_directed()
+        self.visibility = np.divide(
+            1.0,
+            self.distance,
+            out=np.zeros_like(self.distance),
+            where=self.adjacency & (self.distance > 0),
+        )
+        self.reset_pheromone()
+
+    def _nearest_neighbors(self, k: int) -> np.ndarray:
+        k = min(k, self.num_cities - 1)
+        if self.weights is not None:
+            self._kdtree = None
+            weights = self.weights.copy()
+            np.fill_diagonal(weights, np.inf)
+            return np.argpartition(weights, k - 1, axis=1)[:, :k]
+
+        self._kdtree = KDTree(self.coordinates)
+        _, neighbors = self._kdtree.query(self.coordinates, k=k + 1)
+        neighbors = neighbors.reshape(self.num_cities, k + 1)
+        # Drop each city itself (not necessarily in column 0 with duplicate points)
+        is_self = neighbors == np.arange(self.num_cities)[:, np.newaxis]
+        order = np.argsort(is_self, axis=1, kind="stable")
+        return np.take_along_axis(neighbors, order, axis=1)[:, :k]
+
+    def reset_pheromone(self):
+        self.pheromone = np.where(self.adjacency, self.pheromone_init, 0.0)
+
+    def labels(self, indices) -> list:
+        """Map row/column indices back to node labels."""
+        return self._node_array[indices].tolist()
+
+    def indices(self, cities) -> np.ndarray:
+        """Map a sequence of node labels to their row/column indices."""
+        return np.fromiter(
+            (self.node_index[city] for city in cities), dtype=np.intp, count=len(cities)
+        )
 
-        return cls(g)
+    def _metric(self, i, j) -> np.ndarray:
+        if self.weights is not None:
+            return self.weights[i, j]
+        if self.metric is not None:
+            return self.metric(self.coordinates[i], self.coordinates[j])
+        deltas = self.coordinates[i] - self.coordinates[j]
+        return np.hypot(deltas[..., 0], deltas[..., 1])
+
+    def distance_between(self, i, j) -> np.ndarray:
+        """Distances between the cities with indices ``i`` and ``j`` (broadcast)."""
+        if self.candidates is None:
+            return self.distance[i, j]
+        return self._metric(i, j)
+
+    def closest(self, i: int, allowed: np.ndarray) -> int:
+        """Closest city to city ``i`` among those where ``allowed`` is true.
+
+        Only available with candidate lists; widens a k-d tree query until it hits an
+        allowed city, so it is cheap while the neighbourhood is still unvisited.
+        """
+        if self._kdtree is None:
+            distances = np.where(allowed > 0, self.weights[i], np.inf)
+            nearest = np.argmin(distances)
+            return nearest if np.isfinite(distances[nearest]) else i
+
+        k = 2 * self.candidates.shape[1]
+        while True:
+            k = min(k, self.num_cities)
+            _, near = self._kdtree.query(self.coordinates[i], k=k)
+            near = near[allowed[near] > 0]
+            if near.size:
+                return near[0]
+            if k == self.num_cities:
+                return i
+            k *= 4
+
+    def slots(self, i, j) -> tuple[np.ndarray, np.ndarray]:
+        """Columns of the edges ``i -> j`` in the edge arrays, and whether they exist."""
+        i, j = np.broadcast_arrays(i, j)
+        if self.candidates is None:
+            return j, self.adjacency[i, j]
+        keys = i * self.num_cities + j
+        positions = np.searchsorted(self._candidate_keys, keys)
+        positions = np.minimum(positions, self._candidate_keys.size - 1)
+        found = self._candidate_keys[positions] == keys
+        return positions - i * self.candidates.shape[1], found
+
+    def pheromone_between(self, i, j) -> np.ndarray:
+        """Pheromone on the edges ``i -> j``; zero for edges that are not kept."""
+        slots, found = self.slots(i, j)
+        return np.where(found, self.pheromone[i, np.where(found, slots, 0)], 0.0)
+
+    def deposit(self, i, j, amount):
+        """Add ``amount`` of pheromone on the kept edges among ``i -> j``.
+
+        All deposits are applied with a single scatter-add, so ``i``, ``j`` and
+        ``amount`` can hold a whole iteration's worth of edges.
+        """
+        i, j, amount = np.broadcast_arrays(i, j, amount)
+        if self.symmetric:
+            i, j = np.concatenate([i, j]), np.concatenate([j, i])
+            amount = np.concatenate([amount, amount])
+        slots, found = self.slots(i, j)
+        np.add.at(self.pheromone, (i[found], slots[found]), amount[found])
+
+    def edge_pheromone(self) -> np.ndarray:
+        """Pheromone levels aligned with ``self.g.edges()``, e.g. for edge widths."""
+        edges = self.indices([node for edge in self.g.edges() for node in edge])
+        pheromone = self.pheromone_between(edges[0::2], edges[1::2])
+        if self.symmetric:
+            # Candidate lists are not symmetric, either direction may hold the trail
+            pheromone = np.maximum(
+                pheromone, self.pheromone_between(edges[1::2], edges[0::2])
+            )
+        return pheromone
 
     @classmethod
-    def from_tsp_file(cls, file_path: str) -> "TSPGraph":
-        with open(file_path) as f:
-            lines = f.readlines()
-            # Skip lines until reach the text "NODE_COORD_SECTION"
-            while lines.pop(0).strip() != "NODE_COORD_SECTION":
-                pass
-
-            g = nx.Graph()
-            for line in lines:
-                if line.strip() == "EOF":
-                    break
-                node_coordinate = NodeCoordinates.from_line(line)
-
-                g.add_node(
-                    node_coordinate.city, pos=(node_coordinate.x, node_coordinate.y)
-                )
+    def from_random(
+        cls, num_cities: int, seed: int = 0, candidate_k: int | None = None
+    ) -> "TSPGraph":
+        if candidate_k is None:
+            g = nx.random_geometric_graph(num_cities, 2.0, seed=seed).to_directed()
+            return cls(g)
+
+        # Same positions as above, without connecting every pair of cities
+        g = nx.random_geometric_graph(num_cities, 0.0, seed=seed)
+        return cls.from_coordinates(
+            [g.nodes[node]["pos"] for node in g.nodes], candidate_k=candidate_k
+        )
 
-        # Add edges between all nodes to make a complete graph
-        for u in g.nodes():
-            for v in g.nodes():
-                if u == v:
-                    continue
-                g.add_edge(u, v)
+    @classmethod
+    def from_coordinates(
+        cls,
+        coordinates,
+        nodes=None,
+        candidate_k: int | None = None,
+        pheromone_init: float = 1e-6,
+        metric=None,
+        weights: np.ndarray | None = None,
+    ) -> "TSPGraph":
+        """Build an instance from ``(N, 2)`` city coordinates.
+
+        With ``candidate_k`` only the k-nearest-neighbour edges are added to the graph,
+        so the complete graph is never materialized.
+        """
+        coordinates = np.asarray(coordinates, dtype=float)
+        if nodes is None:
+            nodes = range(len(coordinates))
+        g = nx.Graph()
+        g.add_nodes_from(
+            (node, {"pos": tuple(xy)}) for node, xy in zip(nodes, coordinates.tolist())
+        )
+        if candidate_k is None:
+            # Add edges between all nodes to make a complete graph
+            g.add_edges_from(itertools.combinations(g.nodes, 2))
+
+        tsp_graph = cls(
+            g,
+            pheromone_init=pheromone_init,
+            candidate_k=candidate_k,
+            metric=metric,
+            weights=weights,
+        )
+        if candidate_k is not None:
+            sources = np.repeat(np.arange(tsp_graph.num_cities), candidate_k)
+            g.add_edges_from(
+                zip(
+                    tsp_graph.labels(sources),
+                    tsp_graph.labels(tsp_graph.candidates.ravel()),
+                )
+            )
+        return tsp_graph
 
-        return cls(g)
+    @classmethod
+    def from_tsp_file(
+        cls, file_path: str, candidate_k: int | None = None
+    ) -> "TSPGraph":
+        """Load a TSPLIB instance, with the distance function of its header."""
+        instance = read_tsplib(file_path)
+        coordinates = instance.coordinates
+        if coordinates is None:
+            # Explicit distances without display data: lay the cities out on a circle
+            angles = np.linspace(0, 2 * np.pi, instance.dimension, endpoint=False)
+            coordinates = np.column_stack([np.cos(angles), np.sin(angles)])
+
+        return cls.from_coordinates(
+            coordinates,
+            nodes=instance.nodes.tolist(),
+            candidate_k=candidate_k,
+            metric=instance.metric,
+            weights=instance.weights,
+        )
 
 
 class AntTSP(CellAgent):
@@ -90,47 +287,58 @@ class AntTSP(CellAgent):
         self._traveled_distance = 0
         self.tsp_solution = []
         self.tsp_distance = 0
+        # tsp_solution as row/column indices of the TSPGraph arrays
+        self.tsp_tour = np.empty(0, dtype=np.intp)
         self.graph = self.model.grid.G
 
     def calculate_pheromone_delta(self, q: float = 100):
-        results = {}
-        for idx, start_city in enumerate(self.tsp_solution[:-1]):
-            end_city = self.tsp_solution[idx + 1]
-            results[(start_city, end_city)] = q / self.tsp_distance
-
-        return results
+        """The ``(from, to, amount)`` deposits of this ant's tour, as index arrays."""
+        return (
+            self.tsp_tour[:-1],
+            self.tsp_tour[1:],
+            np.full(self.tsp_tour.size - 1, q / self.tsp_distance),
+        )
 
     def move_to(self, cell) -> None:
         self._cities_visited.append(cell)
         if self.cell:
-            self._traveled_distance += self.graph[self.cell.coordinate][
-                cell.coordinate
-            ]["distance"]
+            tsp_graph = self.model.tsp_graph
+            self._traveled_distance += tsp_graph.distance_between(
+                tsp_graph.node_index[self.cell.coordinate],
+                tsp_graph.node_index[cell.coordinate],
+            )
         super().move_to(cell)
 
     def decide_next_city(self):
         # Random
         # new_city = self.random.choice(list(self.model.all_cities - set(self.cities_visited)))
         # Choose closest city not yet visited
-        neighbors = self.cell.neighborhood
+        tsp_graph = self.model.tsp_graph
+        i = tsp_graph.node_index[self.cell.coordinate]
+        if tsp_graph.candidates is None:
+            neighbors = self.cell.neighborhood
+        else:
+            neighbors = [self.model.city_cells[j] for j in tsp_graph.candidates[i]]
         candidates = [n for n in neighbors if n not in self._cities_visited]
         if len(candidates) == 0:
-            return self.cell
+            if tsp_graph.candidates is None:
+                return self.cell
+            # Candidate list used up: go to the closest of all unvisited cities
+            allowed = np.ones(self.model.num_cities, dtype=bool)
+            allowed[
+                tsp_graph.indices([city.coordinate for city in self._cities_visited])
+            ] = False
+            return self.model.city_cells[tsp_graph.closest(i, allowed)]
 
         # p_ij(t) = 1/Z*[(tau_ij)**alpha * (1/distance)**beta]
-        results = []
-        for city in candidates:
-            val = (
-                (self.graph[self.cell.coordinate][city.coordinate]["pheromone"])
-                ** self.alpha
-                * (self.graph[self.cell.coordinate][city.coordinate]["visibility"])
-                ** self.beta
-            )
-            results.append(val)
-
-        results = np.array(results)
-        norm = results.sum()
-        results /= norm
+        j, _ = tsp_graph.slots(
+            i, tsp_graph.indices([city.coordinate for city in candidates])
+        )
+        results = (
+            tsp_graph.pheromone[i, j] ** self.alpha
+            * tsp_graph.visibility[i, j] ** self.beta
+        )
+        results /= results.sum()
 
         new_city = self.random.choices(candidates, weights=results)[0]
 
@@ -147,7 +355,9 @@ class AntTSP(CellAgent):
 
         self.tsp_solution = [entry.coordinate for entry in self._cities_visited]
         self.tsp_distance = self._traveled_distance
-        self._cities_visited = []
+        self.tsp_tour = self.model.tsp_graph.indices(self.tsp_solution)
+        # The next tour starts where this one ended
+        self._cities_visited = [self.cell]
         self._traveled_distance = 0
 
 
@@ -161,6 +371,17 @@ class AcoTspModel(mesa.Model):
 
     There is only one model-level parameter: how many agents the model contains. When a new model
     is started, we want it to populate itself with the given number of agents.
+
+    ``tour_construction`` selects how ants build their tours each step: ``"agent"`` moves every
+    ant hop by hop through the ``Network`` space, while ``"batched"`` builds all tours at once on
+    the pheromone/visibility matrices and writes the results back to the ants.
+
+    ``local_search`` optionally improves the tours before the pheromone update with
+    ``"2-opt"``, ``"or-opt"`` or ``"2-opt+or-opt"``, on the best tour of the step or on
+    ``"all"`` of them (``local_search_scope``), within ``local_search_budget`` seconds.
+
+    ``pheromone_update`` is the update rule, one of the strategies in ``aco_tsp.pheromone``
+    (Ant System by default).
     """
 
     def __init__(
@@ -170,14 +391,33 @@ class AcoTspModel(mesa.Model):
         ant_alpha: float = 1.0,
         ant_beta: float = 5.0,
         tsp_graph: TSPGraph = TSP_GRAPH,
+        tour_construction: str = "agent",
+        local_search: str | None = None,
+        local_search_scope: str = "best",
+        local_search_budget: float | None = None,
+        pheromone_update: AntSystem | None = None,
+        seed=None,
     ):
-        super().__init__()
+        super().__init__(seed=seed)
+        if tour_construction not in ("agent", "batched"):
+            raise ValueError(f"Unknown tour construction mode: {tour_construction}")
+        if local_search is not None and local_search not in METHODS:
+            raise ValueError(f"Unknown local search: {local_search}")
+        if local_search_scope not in ("best", "all"):
+            raise ValueError(f"Unknown local search scope: {local_search_scope}")
         self.num_agents = num_agents
+        self.tour_construction = tour_construction
+        self.local_search = local_search
+        self.local_search_scope = local_search_scope
+        self.local_search_budget = local_search_budget
+        self.pheromone_update = pheromone_update or AntSystem()
         self.tsp_graph = tsp_graph
         self.num_cities = tsp_graph.num_cities
         self.all_cities = set(range(self.num_cities))
         self.max_steps = max_steps
         self.grid = Network(tsp_graph.g, random=self.random)
+        cells = {cell.coordinate: cell for cell in self.grid.all_cells}
+        self.city_cells = [cells[city] for city in tsp_graph.nodes]
 
         for _ in range(self.num_agents):
             agent = AntTSP(model=self, alpha=ant_alpha, beta=ant_beta)
@@ -189,10 +429,11 @@ class AcoTspModel(mesa.Model):
 
         self.num_steps = 0
         self.best_path = None
+        self.best_tour = None
         self.best_distance = float("inf")
         self.best_distance_iter = float("inf")
         # Re-initialize pheromone levels
-        tsp_graph._add_edge_properties()
+        tsp_graph.reset_pheromone()
 
         self.datacollector = mesa.datacollection.DataCollector(
             model_reporters={
@@ -210,26 +451,115 @@ class AcoTspModel(mesa.Model):
 
         self.running = True
 
-    def update_pheromone(self, q: float = 100, ro: float = 0.5):
-        # tau_ij(t+1) = (1-ro)*tau_ij(t) + delta_tau_ij(t)
-        # delta_tau_ij(t) = sum_k^M {Q/L^k} * I[i,j \in T^k]
-        delta_tau_ij = {}
-        for k, agent in enumerate(self.agents):
-            delta_tau_ij[k] = agent.calculate_pheromone_delta(q)
+    def update_pheromone(self):
+        self.pheromone_update.update(self)
+
+    def improve_tours(self):
+        """Run the local search on this step's tours, best tour first."""
+        deadline = None
+        if self.local_search_budget is not None:
+            deadline = time.perf_counter() + self.local_search_budget
+
+        ants = sorted(self.agents, key=lambda ant: ant.tsp_distance)
+        if self.local_search_scope == "best":
+            ants = ants[:1]
+        for ant in ants:
+            tour = improve(
+                self.tsp_graph,
+                ant.tsp_tour,
+                method=self.local_search,
+                deadline=deadline,
+            )
+            ant.tsp_tour = tour
+            ant.tsp_solution = self.tsp_graph.labels(tour)
+            ant.tsp_distance = path_length(self.tsp_graph, tour)
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+    def construct_tours(self):
+        """Build the tours of all ants at once.
+
+        Every hop samples the next city of all M ants together: the attractiveness rows of
+        the current cities are masked with an (M, N) visited array and a roulette wheel is
+        spun per row with the model's seeded ``rng``.
+        """
+        tsp_graph = self.tsp_graph
+        ants = list(self.agents)
+        num_ants = len(ants)
+        rows = np.arange(num_ants)
+
+        # Ants sharing (alpha, beta) share one attractiveness matrix
+        exponents, group = np.unique(
+            [(ant.alpha, ant.beta) for ant in ants], axis=0, return_inverse=True
+        )
+        attractiveness = np.stack(
+            [
+                tsp_graph.pheromone**alpha * tsp_graph.visibility**beta
+                for alpha, beta in exponents
+            ]
+        )
+
+        current = tsp_graph.indices([ant.cell.coordinate for ant in ants])
+        tours = np.empty((num_ants, self.num_cities), dtype=np.intp)
+        tours[:, 0] = current
+        distances = np.zeros(num_ants)
+        # 1.0 for cities an ant may still visit, so masking is a multiplication
+        unvisited = np.ones((num_ants, self.num_cities))
+        unvisited[rows, current] = 0.0
+
+        for hop in range(1, self.num_cities):
+            weights = attractiveness[group, current]
+            if tsp_graph.candidates is None:
+                weights *= unvisited
+            else:
+                weights *= unvisited[rows[:, np.newaxis], tsp_graph.candidates[current]]
+            cumulative = np.cumsum(weights, axis=1, out=weights)
+            total = cumulative[:, -1]
+            threshold = self.rng.random(num_ants) * total
+            slot = np.count_nonzero(cumulative <= threshold[:, np.newaxis], axis=1)
+            slot = np.minimum(slot, weights.shape[1] - 1)
+            # Rounding can push the threshold onto the total; take the last reachable city
+            overshoot = np.flatnonzero(
+                (cumulative[rows, slot] <= threshold) & (total > 0)
+            )
+            if overshoot.size:
+                slot[overshoot] = np.argmax(
+                    cumulative[overshoot] >= total[overshoot, np.newaxis], axis=1
+                )
 
-        for i, j in self.grid.G.edges():
-            # Evaporate
-            tau_ij = (1 - ro) * self.grid.G[i][j]["pheromone"]
-            # Add ant's contribution
-            for _, delta_tau_ij_k in delta_tau_ij.items():
-                tau_ij += delta_tau_ij_k.get((i, j), 0.0)
+            if tsp_graph.candidates is None:
+                # Ants without any reachable city stay where they are
+                following = np.where(total > 0, slot, current)
+            else:
+                following = tsp_graph.candidates[current, slot]
+                # Ants that used up their candidates go to the closest unvisited city
+                for ant in np.flatnonzero(total <= 0):
+                    following[ant] = tsp_graph.closest(current[ant], unvisited[ant])
+
+            distances += np.where(
+                following != current,
+                tsp_graph.distance_between(current, following),
+                0.0,
+            )
+            unvisited[rows, following] = 0.0
+            tours[:, hop] = following
+            current = following
 
-            self.grid.G[i][j]["pheromone"] = tau_ij
+        for ant, tour, distance in zip(ants, tours, distances):
+            ant.tsp_tour = tour
+            ant.tsp_solution = tsp_graph.labels(tour)
+            ant.tsp_distance = float(distance)
+            ant.cell = self.city_cells[tour[-1]]
+            ant._cities_visited = [ant.cell]
 
     def step(self):
         """A model step. Used for activating the agents and collecting data."""
-        self.agents.shuffle_do("step")
-        self.update_pheromone()
+        if self.tour_construction == "batched":
+            self.construct_tours()
+        else:
+            self.agents.shuffle_do("step")
+        if self.local_search is not None:
+            self.improve_tours()
 
         # Check len of cities visited by an agent
         best_instance_iter = float("inf")
@@ -238,11 +568,13 @@ class AcoTspModel(mesa.Model):
             if agent.tsp_distance < self.best_distance:
                 self.best_distance = agent.tsp_distance
                 self.best_path = agent.tsp_solution
+                self.best_tour = agent.tsp_tour
 
             if agent.tsp_distance < best_instance_iter:
                 best_instance_iter = agent.tsp_distance
 
         self.best_distance_iter = best_instance_iter
+        self.update_pheromone()
 
         if self.num_steps >= self.max_steps:
             self.running = False
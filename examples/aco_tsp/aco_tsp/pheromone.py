@@ -0,0 +1,95 @@
+"""Pheromone update rules for ``AcoTspModel``.
+
+Each rule evaporates the trail and then applies all deposits of an iteration as one flat
+``(from, to, amount)`` buffer with a single scatter-add on the ``TSPGraph``.
+"""
+
+import numpy as np
+
+
+class AntSystem:
+    """Every ant deposits ``q / L`` on the edges of its tour (Dorigo et al., 1996).
+
+    tau_ij(t+1) = (1-ro)*tau_ij(t) + delta_tau_ij(t)
+    delta_tau_ij(t) = sum_k^M {Q/L^k} * I[i,j in T^k]
+    """
+
+    def __init__(self, q: float = 100, ro: float = 0.5):
+        self.q = q
+        self.ro = ro
+
+    def deposits(self, model) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The ``(from, to, amount)`` buffer of this iteration."""
+        deltas = [ant.calculate_pheromone_delta(self.q) for ant in model.agents]
+        return tuple(np.concatenate(column) for column in zip(*deltas))
+
+    def update(self, model):
+        tsp_graph = model.tsp_graph
+        # Evaporate
+        tsp_graph.pheromone *= 1 - self.ro
+        # Add the ants' contribution
+        tsp_graph.deposit(*self.deposits(model))
+
+
+class ElitistAntSystem(AntSystem):
+    """Ant System plus an extra ``elite_weight * q / L`` along the best tour so far.
+
+    ``elite_weight`` defaults to the number of ants.
+    """
+
+    def __init__(
+        self, q: float = 100, ro: float = 0.5, elite_weight: float | None = None
+    ):
+        super().__init__(q=q, ro=ro)
+        self.elite_weight = elite_weight
+
+    def deposits(self, model):
+        sources, targets, amounts = super().deposits(model)
+        best = model.best_tour
+        weight = len(model.agents) if self.elite_weight is None else self.elite_weight
+        elite = np.full(best.size - 1, weight * self.q / model.best_distance)
+        return (
+            np.concatenate([sources, best[:-1]]),
+            np.concatenate([targets, best[1:]]),
+            np.concatenate([amounts, elite]),
+        )
+
+
+class MaxMinAntSystem(AntSystem):
+    """Only the best ant deposits and trails stay within ``[tau_min, tau_max]``.
+
+    The iteration-best tour is reinforced, or the best tour so far every
+    ``global_best_interval`` iterations. Following Stützle & Hoos (2000),
+    ``tau_max = q / (ro * L_best)`` and ``tau_min`` follows from the probability
+    ``p_best`` of constructing the best tour once the colony has converged.
+    """
+
+    def __init__(
+        self,
+        q: float = 100,
+        ro: float = 0.02,
+        p_best: float = 0.05,
+        global_best_interval: int = 10,
+    ):
+        super().__init__(q=q, ro=ro)
+        self.p_best = p_best
+        self.global_best_interval = global_best_interval
+
+    def deposits(self, model):
+        if model.steps % self.global_best_interval == 0:
+            tour, distance = model.best_tour, model.best_distance
+        else:
+            ant = min(model.agents, key=lambda ant: ant.tsp_distance)
+            tour, distance = ant.tsp_tour, ant.tsp_distance
+        return tour[:-1], tour[1:], np.full(tour.size - 1, self.q / distance)
+
+    def update(self, model):
+        super().update(model)
+        num_cities = model.num_cities
+        tau_max = self.q / (self.ro * model.best_distance)
+        root = self.p_best ** (1 / num_cities)
+        tau_min = tau_max * (1 - root) / (max(num_cities / 2 - 1, 1) * root)
+        pheromone = model.tsp_graph.pheromone
+        np.minimum(pheromone, tau_max, out=pheromone)
+        # Non-edges keep their zero trail
+        np.maximum(pheromone, tau_min, out=pheromone, where=model.tsp_graph.adjacency)
@@ -0,0 +1,162 @@
+"""Streaming reader for TSPLIB ``.tsp`` files.
+
+Coordinates and explicit edge weights are read straight into NumPy arrays without
+holding the file in memory. The distance functions follow the TSPLIB 95 specification
+for the supported ``EDGE_WEIGHT_TYPE`` values.
+"""
+
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+
+
+def euc_2d(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Euclidean distance rounded to the nearest integer."""
+    deltas = a - b
+    return np.floor(np.hypot(deltas[..., 0], deltas[..., 1]) + 0.5)
+
+
+def ceil_2d(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Euclidean distance rounded up."""
+    deltas = a - b
+    return np.ceil(np.hypot(deltas[..., 0], deltas[..., 1]))
+
+
+def att(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pseudo-Euclidean distance of the ATT instances."""
+    deltas = a - b
+    r = np.sqrt((deltas[..., 0] ** 2 + deltas[..., 1] ** 2) / 10.0)
+    t = np.floor(r + 0.5)
+    return np.where(t < r, t + 1, t)
+
+
+def _geo_radians(coordinates: np.ndarray) -> np.ndarray:
+    # DDD.MM degrees/minutes to radians, with the value of pi used by TSPLIB
+    degrees = np.trunc(coordinates)
+    minutes = coordinates - degrees
+    return 3.141592 * (degrees + 5.0 * minutes / 3.0) / 180.0
+
+
+def geo(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Geographical distance in km, for (latitude, longitude) in DDD.MM format."""
+    a, b = _geo_radians(a), _geo_radians(b)
+    q1 = np.cos(a[..., 1] - b[..., 1])
+    q2 = np.cos(a[..., 0] - b[..., 0])
+    q3 = np.cos(a[..., 0] + b[..., 0])
+    argument = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+    return np.trunc(6378.388 * np.arccos(argument) + 1.0)
+
+
+METRICS = {
+    "EUC_2D": euc_2d,
+    "CEIL_2D": ceil_2d,
+    "ATT": att,
+    "GEO": geo,
+}
+
+# Where each EDGE_WEIGHT_FORMAT puts its values, in row-major order. Column-major
+# formats list the same values as the row-major format of the other triangle.
+_TRIANGLES = {
+    "UPPER_ROW": (np.triu_indices, 1),
+    "LOWER_ROW": (np.tril_indices, -1),
+    "UPPER_DIAG_ROW": (np.triu_indices, 0),
+    "LOWER_DIAG_ROW": (np.tril_indices, 0),
+    "UPPER_COL": (np.tril_indices, -1),
+    "LOWER_COL": (np.triu_indices, 1),
+    "UPPER_DIAG_COL": (np.tril_indices, 0),
+    "LOWER_DIAG_COL": (np.triu_indices, 0),
+}
+
+
+@dataclass
+class TSPLIBInstance:
+    name: str
+    dimension: int
+    edge_weight_type: str
+    nodes: np.ndarray
+    coordinates: np.ndarray | None = None
+    weights: np.ndarray | None = None
+
+    @property
+    def metric(self):
+        """Distance function for the coordinates, ``None`` for plain Euclidean."""
+        return METRICS.get(self.edge_weight_type)
+
+
+def _read_values(lines, count: int) -> np.ndarray:
+    values = (float(value) for line in lines for value in line.split())
+    return np.fromiter(values, dtype=float, count=count)
+
+
+def _read_coordinates(lines, dimension: int) -> tuple[np.ndarray, np.ndarray]:
+    table = np.loadtxt(itertools.islice(lines, dimension), ndmin=2)
+    return table[:, 0].astype(np.int64), table[:, 1:3]
+
+
+def _read_weights(lines, dimension: int, edge_weight_format: str) -> np.ndarray:
+    if edge_weight_format == "FULL_MATRIX":
+        count = dimension * dimension
+        return _read_values(lines, count).reshape(dimension, dimension)
+    if edge_weight_format not in _TRIANGLES:
+        raise ValueError(f"Unsupported EDGE_WEIGHT_FORMAT: {edge_weight_format}")
+
+    triangle, offset = _TRIANGLES[edge_weight_format]
+    rows, columns = triangle(dimension, offset)
+    weights = np.zeros((dimension, dimension))
+    weights[rows, columns] = _read_values(lines, rows.size)
+    weights[columns, rows] = weights[rows, columns]
+    return weights
+
+
+def read_tsplib(file_path: str) -> TSPLIBInstance:
+    """Read a symmetric TSPLIB instance.
+
+    Supports coordinates with ``EDGE_WEIGHT_TYPE`` ``EUC_2D``, ``CEIL_2D``, ``ATT`` and
+    ``GEO``, and ``EXPLICIT`` edge weights in any ``EDGE_WEIGHT_FORMAT``. For explicit
+    instances the coordinates come from ``DISPLAY_DATA_SECTION`` if there is one.
+    """
+    header = {}
+    coordinates = weights = None
+    nodes = None
+    with open(file_path) as f:
+        for raw_line in f:
+            line = raw_line.strip()
+            if not line or line == "EOF":
+                continue
+            if ":" in line:
+                key, value = line.split(":", 1)
+                header[key.strip().upper()] = value.strip()
+                continue
+
+            section = line.upper()
+            dimension = int(header["DIMENSION"])
+            if section == "NODE_COORD_SECTION":
+                nodes, coordinates = _read_coordinates(f, dimension)
+            elif section == "DISPLAY_DATA_SECTION":
+                display_nodes, display = _read_coordinates(f, dimension)
+                if coordinates is None:
+                    nodes, coordinates = display_nodes, display
+            elif section == "EDGE_WEIGHT_SECTION":
+                edge_weight_format = header.get("EDGE_WEIGHT_FORMAT", "FULL_MATRIX")
+                weights = _read_weights(f, dimension, edge_weight_format.upper())
+            elif section == "FIXED_EDGES_SECTION":
+                # Terminated by -1, not used by the ants
+                for entry in f:
+                    if entry.strip() == "-1":
+                        break
+
+    edge_weight_type = header.get("EDGE_WEIGHT_TYPE", "").upper()
+    if edge_weight_type not in (*METRICS, "EXPLICIT", ""):
+        raise ValueError(f"Unsupported EDGE_WEIGHT_TYPE: {edge_weight_type}")
+    if nodes is None:
+        nodes = np.arange(1, int(header["DIMENSION"]) + 1)
+
+    return TSPLIBInstance(
+        name=header.get("NAME", ""),
+        dimension=int(header["DIMENSION"]),
+        edge_weight_type=edge_weight_type,
+        nodes=nodes,
+        coordinates=coordinates,
+        weights=weights,
+    )
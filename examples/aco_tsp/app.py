@@ -42,9 +42,9 @@ def make_graph(model):
     ax.set_title("Cities and pheromone trails")
     graph = model.grid.G
     pos = model.tsp_graph.pos
-    weights = [graph[u][v]["pheromone"] for u, v in graph.edges()]
+    weights = model.tsp_graph.edge_pheromone()
     # normalize the weights
-    weights = [w / max(weights) for w in weights]
+    weights = weights / weights.max()
 
     nx.draw(
         graph,
@@ -0,0 +1,36 @@
+import os
+
+import matplotlib.pyplot as plt
+from aco_tsp.colonies import run_colonies
+from aco_tsp.model import TSPGraph
+
+
+def main():
+    tsp_graph = TSPGraph.from_tsp_file("aco_tsp/data/kroA100.tsp")
+    # One colony per core, each with its own seed and pheromone/heuristic trade-off
+    colony_params = [
+        {"seed": seed, "ant_alpha": 1.0, "ant_beta": 2.0 + seed % 4}
+        for seed in range(os.cpu_count() or 1)
+    ]
+
+    results = run_colonies(
+        tsp_graph,
+        colony_params,
+        num_steps=50,
+        migration_interval=10,
+        num_agents=tsp_graph.num_cities,
+        tour_construction="batched",
+    )
+
+    print(f"Best distance: {results['best_distance']:.2f}")
+    print(f"Best path: {results['best_path']}")
+
+    _, ax = plt.subplots()
+    results["history"].plot(ax=ax, legend=False, alpha=0.5)
+    results["history"]["best_distance"].plot(ax=ax, color="black")
+    ax.set(xlabel="Episode", ylabel="Best distance", title="Best distance per colony")
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ def main():
     model_params = {
         "num_agents": tsp_graph.num_cities,
         "tsp_graph": tsp_graph,
+        "tour_construction": "batched",
     }
     number_of_episodes = 50
 
@@ -25,8 +26,11 @@ def main():
         model.step()
         results["best_distance"].append(model.best_distance)
         results["best_path"].append(model.best_path)
+        pheromone_17_15 = tsp_graph.pheromone[
+            tsp_graph.node_index[17], tsp_graph.node_index[15]
+        ]
         print(
-            f"Episode={e + 1}; Min. distance={model.best_distance:.2f}; pheromone_1_8={model.grid.G[17][15]['pheromone']:.4f}"
+            f"Episode={e + 1}; Min. distance={model.best_distance:.2f}; pheromone_17_15={pheromone_17_15:.4f}"
         )
         if model.best_distance < best_distance:
             best_distance = model.best_distance
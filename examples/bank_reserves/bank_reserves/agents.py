@@ -184,3 +184,32 @@ class Person(CellAgent):
         self.balance_books()
         # update the bank's reserves and the amount it can loan right now
         self.bank.bank_balance()
+
+
+def _people_column(name):
+    def get(self):
+        return getattr(self.model.people, name)[self.index].item()
+
+    def set(self, value):
+        getattr(self.model.people, name)[self.index] = value
+
+    return property(get, set)
+
+
+class ArrayPerson(Person):
+    """A Person whose accounts are a row of the model's ``People`` arrays.
+
+    Used by the "arrays" engine of BankReservesModel, which steps all people at once
+    (see vectorized.py); the attributes read and write row ``index`` of
+    ``model.people``, so the batched updates need no copying back.
+    """
+
+    wallet = _people_column("wallet")
+    savings = _people_column("savings")
+    loans = _people_column("loans")
+    wealth = _people_column("wealth")
+
+    def __init__(self, model, moore, bank, rich_threshold, index):
+        # the row must be known before Person.__init__ sets the accounts
+        self.index = index
+        super().__init__(model, moore, bank, rich_threshold)
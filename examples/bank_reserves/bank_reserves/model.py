@@ -13,7 +13,8 @@ import mesa
 import numpy as np
 from mesa.discrete_space import OrthogonalMooreGrid
 
-from .agents import Bank, Person
+from . import vectorized
+from .agents import ArrayPerson, Bank, Person
 
 """
 If you want to perform a parameter sweep, call batch_run.py instead of run.py.
@@ -23,54 +24,73 @@ For details see batch_run.py in the same directory as run.py.
 # Start of datacollector functions
 
 
+def get_summary(model):
+    """Class counts and money totals of all people, computed once per step.
+
+    All the reporters below read from this summary, so the people are only gathered
+    once per collection, however many columns are reported.
+    """
+    cached = getattr(model, "_summary", None)
+    if cached is not None and cached[0] == model.steps:
+        return cached[1]
+
+    people = getattr(model, "people", None)
+    if people is not None:
+        # the array engine already has every account in one array
+        savings, wallets, loans = people.savings, people.wallet, people.loans
+    else:
+        agents = list(model.agents)
+        savings = np.array([a.savings for a in agents])
+        wallets = np.array([a.wallet for a in agents])
+        loans = np.array([a.loans for a in agents])
+    summary = {
+        "Rich": int(np.count_nonzero(savings > model.rich_threshold)),
+        "Poor": int(np.count_nonzero(loans > 10)),
+        "Middle Class": int(
+            np.count_nonzero((loans < 10) & (savings < model.rich_threshold))
+        ),
+        "Savings": savings.sum(),
+        "Wallets": wallets.sum(),
+        "Loans": loans.sum(),
+    }
+    summary["Money"] = summary["Wallets"] + summary["Savings"]
+    model._summary = (model.steps, summary)
+    return summary
+
+
 def get_num_rich_agents(model):
     """Return number of rich agents"""
-    rich_agents = [a for a in model.agents if a.savings > model.rich_threshold]
-    return len(rich_agents)
+    return get_summary(model)["Rich"]
 
 
 def get_num_poor_agents(model):
     """Return number of poor agents"""
-    poor_agents = [a for a in model.agents if a.loans > 10]
-    return len(poor_agents)
+    return get_summary(model)["Poor"]
 
 
 def get_num_mid_agents(model):
     """Return number of middle class agents"""
-    mid_agents = [
-        a for a in model.agents if a.loans < 10 and a.savings < model.rich_threshold
-    ]
-    return len(mid_agents)
+    return get_summary(model)["Middle Class"]
 
 
 def get_total_savings(model):
     """Sum of all agents' savings"""
-    agent_savings = [a.savings for a in model.agents]
-    # return the sum of agents' savings
-    return np.sum(agent_savings)
+    return get_summary(model)["Savings"]
 
 
 def get_total_wallets(model):
     """Sum of amounts of all agents' wallets"""
-    agent_wallets = [a.wallet for a in model.agents]
-    # return the sum of all agents' wallets
-    return np.sum(agent_wallets)
+    return get_summary(model)["Wallets"]
 
 
 def get_total_money(model):
-    # sum of all agents' wallets
-    wallet_money = get_total_wallets(model)
-    # sum of all agents' savings
-    savings_money = get_total_savings(model)
-    # return sum of agents' wallets and savings for total money
-    return wallet_money + savings_money
+    """Sum of all agents' wallets and savings"""
+    return get_summary(model)["Money"]
 
 
 def get_total_loans(model):
-    # list of amounts of all agents' loans
-    agent_loans = [a.loans for a in model.agents]
-    # return sum of all agents' loans
-    return np.sum(agent_loans)
+    """Sum of all agents' loans"""
+    return get_summary(model)["Loans"]
 
 
 class BankReservesModel(mesa.Model):
@@ -88,6 +108,13 @@ class BankReservesModel(mesa.Model):
     reserves and the bank's ability to loan at any given time is a function of
     the amount of deposits, its reserves, and its current total outstanding loan
     amount.
+
+    With engine="arrays" the people's accounts and positions are kept in NumPy
+    arrays and every step runs as batched phases (see vectorized.py), which scales
+    to many thousands of people. Within a step everybody moves, then trades, then
+    settles with the bank, rather than each person doing all three in turn. The
+    aggregates agree with the agent engine on average over seeds, not run by run
+    (see the Readme).
     """
 
     # grid height
@@ -105,13 +132,18 @@ class BankReservesModel(mesa.Model):
         init_people=2,
         rich_threshold=10,
         reserve_percent=50,
+        engine="agents",
+        seed=None,
     ):
-        super().__init__()
+        super().__init__(seed=seed)
+        if engine not in ("agents", "arrays"):
+            raise ValueError(f"Unknown engine: {engine!r}")
         self.height = height
         self.width = width
         self.init_people = init_people
+        self.engine = engine
 
-        self.grid = OrthogonalMooreGrid(
+        self._grid = OrthogonalMooreGrid(
             (self.width, self.height), torus=True, random=self.random
         )
         # rich_threshold is the amount of savings a person needs to be considered "rich"
@@ -133,22 +165,54 @@ class BankReservesModel(mesa.Model):
 
         # create a single bank for the model
         self.bank = Bank(self, self.reserve_percent)
+        if self.engine == "arrays":
+            self.people = vectorized.People(self.init_people)
+            self._people = []
 
         # create people for the model according to number of people set by user
-        for _ in range(self.init_people):
+        for i in range(self.init_people):
             # set x, y coords randomly within the grid
             x = self.random.randrange(self.width)
             y = self.random.randrange(self.height)
-            p = Person(self, True, self.bank, self.rich_threshold)
+            if self.engine == "arrays":
+                p = ArrayPerson(self, True, self.bank, self.rich_threshold, i)
+                self.people.x[i], self.people.y[i] = x, y
+                self._people.append(p)
+            else:
+                p = Person(self, True, self.bank, self.rich_threshold)
             # place the Person object on the grid at coordinates (x, y)
-            p.move_to(self.grid[(x, y)])
+            p.move_to(self._grid[(x, y)])
+        if self.engine == "arrays":
+            self._placed = (self.people.x.copy(), self.people.y.copy())
 
         self.running = True
         self.datacollector.collect(self)
 
+    @property
+    def grid(self):
+        """The grid, with the people moved to their current cells.
+
+        The arrays engine only tracks positions in ``people.x`` and ``people.y``, so
+        the cells are brought up to date when the grid is looked at (e.g. to draw it)
+        instead of every step.
+        """
+        if self.engine == "arrays":
+            placed_x, placed_y = self._placed
+            x, y = self.people.x, self.people.y
+            for i in np.flatnonzero((x != placed_x) | (y != placed_y)).tolist():
+                self._people[i].cell = self._grid[(int(x[i]), int(y[i]))]
+            self._placed = (x.copy(), y.copy())
+        return self._grid
+
     def step(self):
-        # tell all the agents in the model to run their step function
-        self.agents.shuffle_do("step")
+        if self.engine == "arrays":
+            order = self.rng.permutation(len(self.people))
+            vectorized.move(self.people, self.width, self.height, self.rng)
+            partners, amounts = vectorized.trade(self.people, self.height, self.rng)
+            vectorized.settle(self.people, self.bank, order, partners, amounts)
+        else:
+            # tell all the agents in the model to run their step function
+            self.agents.shuffle_do("step")
         # collect data
         self.datacollector.collect(self)
 
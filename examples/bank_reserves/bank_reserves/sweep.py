@@ -0,0 +1,181 @@
+"""Parameter sweeps of the Bank Reserves model that stream their data to Parquet.
+
+Every run is executed in a worker process of a pool. Instead of keeping the whole
+history of a run in its DataCollector, the worker writes the collected model and agent
+rows to Parquet every ``chunk_steps`` steps and then empties the DataCollector, so
+memory stays bounded however long the runs are. Once all runs are done, their files
+are combined into one dataset per table, partitioned by the swept parameters.
+"""
+
+import itertools
+import multiprocessing as mp
+import shutil
+from pathlib import Path
+
+import mesa
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from tqdm.auto import tqdm
+
+from .model import BankReservesModel
+
+TABLES = ("model", "agents")
+
+
+def _make_runs(parameters, iterations, seed):
+    """One (run_id, iteration, kwargs) per combination of parameters and iteration.
+
+    As in ``mesa.batch_run``, a parameter is swept if its value is a list, range or
+    tuple, and fixed otherwise.
+    """
+    names = list(parameters)
+    values = [
+        value if isinstance(value, list | range | tuple) else [value]
+        for value in parameters.values()
+    ]
+    combinations = itertools.product(range(iterations), itertools.product(*values))
+    for run_id, (iteration, combination) in enumerate(combinations):
+        kwargs = dict(zip(names, combination))
+        if seed is not None:
+            kwargs.setdefault("seed", seed + run_id)
+        yield run_id, iteration, kwargs
+
+
+def _drain(model, steps):
+    """Take the rows collected so far out of the model's DataCollector as Arrow tables.
+
+    The DataCollector is replaced by an empty one with the same reporters.
+    """
+    datacollector = model.datacollector
+    model_vars = datacollector.get_model_vars_dataframe()
+    model_vars.insert(0, "Step", steps)
+    agent_vars = datacollector.get_agent_vars_dataframe().reset_index()
+    model.datacollector = mesa.DataCollector(
+        model_reporters=datacollector.model_reporters,
+        agent_reporters=datacollector.agent_reporters,
+    )
+    return {
+        "model": pa.Table.from_pandas(model_vars, preserve_index=False),
+        "agents": pa.Table.from_pandas(agent_vars, preserve_index=False),
+    }
+
+
+def _with_run_columns(table, run_id, iteration, kwargs):
+    columns = {"RunId": run_id, "iteration": iteration, **kwargs}
+    for position, (name, value) in enumerate(columns.items()):
+        table = table.add_column(position, name, pa.array([value] * len(table)))
+    return table
+
+
+def _run(run_id, iteration, kwargs, max_steps, chunk_steps, runs_dir):
+    """Run one model and stream its data to ``runs_dir/<table>/run-<run_id>.parquet``."""
+    model = BankReservesModel(**kwargs)
+    writers = {}
+    try:
+        # The initial state is collected when the model is created
+        first_step = 0
+        while True:
+            done = not model.running or model.steps >= max_steps
+            if done or model.steps - first_step + 1 >= chunk_steps:
+                steps = range(first_step, model.steps + 1)
+                chunks = _drain(model, steps)
+                for table, rows in chunks.items():
+                    chunk = _with_run_columns(rows, run_id, iteration, kwargs)
+                    if table not in writers:
+                        path = runs_dir / table / f"run-{run_id:06d}.parquet"
+                        writers[table] = pq.ParquetWriter(path, chunk.schema)
+                    writers[table].write_table(chunk)
+                first_step = model.steps + 1
+            if done:
+                break
+            model.step()
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return run_id
+
+
+def _run_star(args):
+    return _run(*args)
+
+
+def run_sweep(
+    parameters,
+    output_dir="bank_reserves_sweep",
+    iterations=1,
+    max_steps=1000,
+    chunk_steps=100,
+    number_processes=None,
+    seed=None,
+    display_progress=True,
+):
+    """Run every combination of ``parameters`` in a process pool.
+
+    Args:
+        parameters: Keyword arguments of ``BankReservesModel``. Lists, ranges and
+            tuples are swept, other values are fixed.
+        output_dir: Directory of the resulting datasets, ``<output_dir>/model`` and
+            ``<output_dir>/agents``, partitioned by the swept parameters. Datasets
+            of an earlier sweep into the same directory are deleted first.
+        iterations: Number of runs of every combination.
+        max_steps: Number of steps of every run.
+        chunk_steps: Number of collected steps a worker keeps in memory before
+            writing them out.
+        number_processes: Size of the process pool, the number of CPUs if None.
+        seed: If given, run ``i`` uses seed ``seed + i``, unless ``parameters``
+            sets the seed.
+        display_progress: Show a progress bar.
+
+    Returns:
+        The paths of the model and agent datasets, to open with
+        ``pyarrow.dataset.dataset(path, partitioning="hive")`` or
+        ``pandas.read_parquet(path)``.
+    """
+    if chunk_steps < 1:
+        raise ValueError("chunk_steps must be at least 1")
+    output_dir = Path(output_dir)
+    runs_dir = output_dir / "_runs"
+    # Start from scratch, the datasets are written partition by partition
+    for path in [runs_dir, *(output_dir / table for table in TABLES)]:
+        if path.exists():
+            shutil.rmtree(path)
+    for table in TABLES:
+        (runs_dir / table).mkdir(parents=True, exist_ok=True)
+
+    runs = list(_make_runs(parameters, iterations, seed))
+    tasks = [
+        (run_id, iteration, kwargs, max_steps, chunk_steps, runs_dir)
+        for run_id, iteration, kwargs in runs
+    ]
+    with mp.Pool(number_processes) as pool:
+        for _ in tqdm(
+            pool.imap_unordered(_run_star, tasks),
+            total=len(tasks),
+            disable=not display_progress,
+        ):
+            pass
+
+    swept = [
+        name
+        for name, value in parameters.items()
+        if isinstance(value, list | range | tuple)
+    ]
+    paths = {}
+    for table in TABLES:
+        files = sorted((runs_dir / table).glob("*.parquet"))
+        # Runs may disagree on int vs. float columns, e.g. between engines
+        schema = pa.unify_schemas(
+            [pq.read_schema(file) for file in files], promote_options="permissive"
+        )
+        paths[table] = output_dir / table
+        ds.write_dataset(
+            ds.dataset(files, schema=schema),
+            paths[table],
+            format="parquet",
+            partitioning=swept or None,
+            partitioning_flavor="hive",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+    shutil.rmtree(runs_dir)
+    return paths["model"], paths["agents"]
@@ -0,0 +1,177 @@
+"""Array-backed engine for the Bank Reserves model.
+
+People's money and positions live in NumPy arrays, and a step runs as three batched
+phases instead of one ``Person.step`` after the other: everybody moves, everybody who
+can trades with a random person on their cell, and everybody settles their books with
+the bank. Loans are still granted one borrower at a time in the step's random order,
+because the bank's reserve constraint makes each loan depend on everything settled
+before it.
+
+The step's random order also decides when money changes hands. In the agent version
+a person can be paid by somebody who comes later in the order, after they have
+already settled their books, and that money stays in their wallet until the next
+step. And a person with neither savings nor money in their wallet only pays their
+customer if the bank can loan when their turn comes. ``settle`` therefore makes the
+payments too, and goes through those people and their customers in order.
+"""
+
+import numpy as np
+
+# Offsets of the Moore neighborhood
+MOORE = np.array(
+    [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+)
+
+
+class People:
+    """Wallets, savings, loans, wealth and positions of all people, one row each."""
+
+    def __init__(self, n):
+        self.wallet = np.zeros(n)
+        self.savings = np.zeros(n)
+        self.loans = np.zeros(n)
+        self.wealth = np.zeros(n)
+        self.x = np.zeros(n, dtype=np.int64)
+        self.y = np.zeros(n, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.wallet)
+
+
+def move(people, width, height, rng):
+    """Move everybody to a random cell of their Moore neighborhood on the torus."""
+    offsets = MOORE[rng.integers(len(MOORE), size=len(people))]
+    people.x = (people.x + offsets[:, 0]) % width
+    people.y = (people.y + offsets[:, 1]) % height
+
+
+def trade(people, height, rng):
+    """Pick a trade with a random other person on their cell for everybody.
+
+    As in ``Person.do_business``, a person trades if there is somebody else on their
+    cell, with a 50% chance, and then pays them $5 or $2 (50% chance each). Whether
+    they can pay depends on what the bank can loan when their turn comes, so the
+    payments are made in ``settle``.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Everybody's customer, and the amount they pay
+        them (0 for the people who do not trade)
+    """
+    n = len(people)
+    cells = people.x * height + people.y
+    # Group people by cell: the people of a cell are a contiguous run in `by_cell`
+    by_cell = np.argsort(cells, kind="stable")
+    sorted_cells = cells[by_cell]
+    starts = np.searchsorted(sorted_cells, sorted_cells, side="left")
+    sizes = np.searchsorted(sorted_cells, sorted_cells, side="right") - starts
+    # A random other person of the same run
+    offsets = rng.integers(1, np.maximum(sizes, 2))
+    ranks = np.arange(n) - starts
+    partners = np.empty(n, dtype=np.int64)
+    partners[by_cell] = by_cell[starts + (ranks + offsets) % sizes]
+    crowded = np.empty(n, dtype=bool)
+    crowded[by_cell] = sizes > 1
+
+    trades = crowded & (rng.random(n) < 0.5)
+    amounts = np.where(rng.random(n) < 0.5, 5.0, 2.0) * trades
+    return partners, amounts
+
+
+def settle(people, bank, order, partners, amounts):
+    """Batched ``Person.do_business`` payments and ``Person.balance_books`` for
+    everybody, in the given order.
+
+    People with savings or money in their wallet always pay their customer, and
+    everybody whose books don't depend on the bank settles at once: deposits,
+    withdrawals and repayments only touch the person's own accounts. The rest go one
+    at a time in ``order`` with what the bank could loan after the people before
+    them settled, like ``bank_to_loan`` in the agent version: the people who are
+    short and need a loan, the broke people who only pay if the bank can loan, and
+    their customers.
+    """
+    n = len(people)
+    wallet, savings, loans = people.wallet, people.savings, people.loans
+    position = np.empty(n, dtype=np.int64)
+    position[order] = np.arange(n)
+    later = position[partners] > position
+
+    # Pay the customer from my wallet (may result in negative wallet). Customers who
+    # already settled keep the money in their wallets until the next step.
+    solvent = (savings > 0) | (wallet > 0)
+    pays = (amounts > 0) & solvent
+    wallet -= amounts * pays
+    np.add.at(wallet, partners[pays & later], amounts[pays & later])
+    late = pays & ~later
+    late_customers, late_amounts = [partners[late]], [amounts[late]]
+
+    broke = (amounts > 0) & ~solvent
+    one_by_one = broke.copy()
+    one_by_one[partners[broke & later]] = True
+    positive = wallet >= 0
+    covered = ~positive & (savings >= -wallet)
+    one_by_one |= ~positive & ~covered
+    batched = ~one_by_one
+
+    # Deposit a positive wallet, or cover a negative one from savings
+    deposits_delta = np.where(batched, wallet, 0.0)
+    savings[batched] += wallet[batched]
+    wallet[batched] = 0
+    # Pay off outstanding loans with savings
+    repayments = np.where(
+        batched & (loans > 0) & (savings > 0), np.minimum(savings, loans), 0.0
+    )
+    savings -= repayments
+    loans -= repayments
+    deposits_delta -= repayments
+
+    # Bank state right before each person settles, in settling order, without the
+    # people who settle one at a time
+    reserve = bank.reserve_percent / 100
+    deposits_before = bank.deposits + np.cumsum(deposits_delta[order])
+    deposits_before -= deposits_delta[order]
+    loans_before = bank.bank_loans + np.cumsum(-repayments[order])
+    loans_before += repayments[order]
+
+    deposited = lent = 0.0
+    for at in np.flatnonzero(one_by_one[order]).tolist():
+        person = order[at]
+        deposits = deposits_before[at] + deposited
+        bank_to_loan = deposits - reserve * deposits - (loans_before[at] + lent)
+        if broke[person] and (wallet[person] > 0 or bank_to_loan > 0):
+            customer, amount = partners[person], amounts[person]
+            wallet[person] -= amount
+            if later[person]:
+                wallet[customer] += amount
+            else:
+                late_customers.append([customer])
+                late_amounts.append([amount])
+
+        w, s, loan = wallet[person], savings[person], loans[person]
+        if w >= 0 or s >= -w:
+            # Deposit a positive wallet, or cover a negative one from savings
+            deposited += w
+            s += w
+            w = 0.0
+        else:
+            # Withdraw all savings, and the bank loans the remaining balance, or
+            # whatever it can loan right now
+            deposited -= s
+            w += s
+            s = 0.0
+            borrowed = min(-w, bank_to_loan)
+            loan += borrowed
+            w += borrowed
+            lent += borrowed
+        if loan > 0 and s > 0:
+            repayment = min(s, loan)
+            s -= repayment
+            loan -= repayment
+            deposited -= repayment
+            lent -= repayment
+        wallet[person], savings[person], loans[person] = w, s, loan
+
+    np.add.at(wallet, np.concatenate(late_customers), np.concatenate(late_amounts))
+    bank.deposits += deposits_delta.sum() + deposited
+    bank.bank_loans += lent - repayments.sum()
+    bank.bank_balance()
+    np.subtract(savings, loans, out=people.wealth)
@@ -8,24 +8,21 @@ Author of NetLogo code:
     Center for Connected Learning and Computer-Based Modeling,
     Northwestern University, Evanston, IL.
 
-This version of the model has a BatchRunner at the bottom. This
-is for collecting data on parameter sweeps. It is not meant to
-be run with run.py, since run.py starts up a server for visualization, which
-isn't necessary for the BatchRunner. To run a parameter sweep, call
-batch_run.py in the command line.
-
-The BatchRunner is set up to collect step by step data of the model. It does
-this by collecting the DataCollector object in a model_reporter (i.e. the
-DataCollector is collecting itself every step).
-
-The end result of the batch run will be a CSV file created in the same
-directory from which Python was run. The CSV file will contain the data from
-every step of every run.
+This script runs a parameter sweep of the model. It is not meant to be run with
+run.py, since run.py starts up a server for visualization, which isn't necessary
+for a sweep. To run a parameter sweep, call batch_run.py in the command line.
+
+The runs are spread over a process pool (see bank_reserves/sweep.py). Every run
+streams the data of its DataCollector to Parquet in chunks of steps, so memory use
+does not grow with the number or length of the runs.
+
+The end result of the sweep are two Parquet datasets in the directory
+"BankReservesModel_Data", "model" and "agents", with the data from every step of
+every run, partitioned by the swept parameters. Load them with e.g.
+pandas.read_parquet("BankReservesModel_Data/model").
 """
 
-import mesa
-import pandas as pd
-from bank_reserves.model import BankReservesModel
+from bank_reserves.sweep import run_sweep
 
 
 def main():
@@ -36,13 +33,10 @@ def main():
         "reserve_percent": 5,
     }
 
-    # The existing batch run logic here
-    data = mesa.batch_run(
-        BankReservesModel,
-        br_params,
+    model_path, agents_path = run_sweep(
+        br_params, output_dir="BankReservesModel_Data", max_steps=1000
     )
-    br_df = pd.DataFrame(data)
-    br_df.to_csv("BankReservesModel_Data.csv")
+    print(f"Model data written to {model_path}, agent data to {agents_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,20 @@
+import numpy as np
+from bank_reserves.model import BankReservesModel
+
+
+def run(engine, seed):
+    model = BankReservesModel(init_people=2000, engine=engine, seed=seed)
+    for _ in range(100):
+        model.step()
+    data = model.datacollector.get_model_vars_dataframe().iloc[-1]
+    return data["Savings"], data["Loans"], data["Wallets"]
+
+
+def test_arrays_engine_matches_agents():
+    # Testing that the engines agree on average over 8 seeds: savings and loans
+    # within 2%, the money left in wallets within 15%. The runs themselves differ,
+    # e.g. the standard deviation of the wallets between seeds is about 10%.
+    agents = np.mean([run("agents", seed) for seed in range(8)], axis=0)
+    arrays = np.mean([run("arrays", seed) for seed in range(8)], axis=0)
+    np.testing.assert_allclose(arrays[:2], agents[:2], rtol=0.02)
+    np.testing.assert_allclose(arrays[2], agents[2], rtol=0.15)
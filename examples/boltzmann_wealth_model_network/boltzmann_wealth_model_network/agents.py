@@ -1,5 +1,8 @@
+from mesa import Agent
 from mesa.discrete_space import CellAgent
 
+from .csr_network import EMPTY
+
 
 class MoneyAgent(CellAgent):
     """An agent with fixed initial wealth.
@@ -24,6 +27,7 @@ class MoneyAgent(CellAgent):
         neighbors = [agent for agent in self.cell.neighborhood.agents if agent != self]
         if len(neighbors) > 0:
             other = self.random.choice(neighbors)
+            self.model.wealth_distribution.transfer(self.wealth, other.wealth)
             other.wealth += 1
             self.wealth -= 1
 
@@ -34,3 +38,53 @@ class MoneyAgent(CellAgent):
 
         if self.wealth > 0:
             self.give_money()
+
+
+class CSRMoneyAgent(Agent):
+    """A MoneyAgent on the model's CSRNetwork instead of a Network space.
+
+    The agent only knows its node; neighbors and who occupies them are read from the
+    network's arrays, so no cell objects are needed for large networks.
+
+    Attributes:
+        wealth (int): The agent's current wealth (starts at 1)
+        index (int): The agent's position in ``model.money_agents``
+        node (int): The node the agent is on
+    """
+
+    def __init__(self, model, index, node):
+        """Create a new agent.
+
+        Args:
+            model (Model): The model instance that contains the agent
+            index (int): The agent's position in ``model.money_agents``
+            node (int): The node to put the agent on
+        """
+        super().__init__(model)
+        self.wealth = 1
+        self.index = index
+        self.node = node
+        model.network.move(index, None, node)
+
+    def give_money(self, occupants):
+        neighbors = occupants[occupants != EMPTY]
+        if len(neighbors) > 0:
+            other = self.model.money_agents[
+                neighbors[self.random.randrange(len(neighbors))]
+            ]
+            self.model.wealth_distribution.transfer(self.wealth, other.wealth)
+            other.wealth += 1
+            self.wealth -= 1
+
+    def step(self):
+        network = self.model.network
+        neighbors = network.neighbors(self.node)
+        empty_neighbors = neighbors[network.occupant[neighbors] == EMPTY]
+        if len(empty_neighbors) > 0:
+            node = empty_neighbors[self.random.randrange(len(empty_neighbors))]
+            network.move(self.index, self.node, node)
+            self.node = node
+            neighbors = network.neighbors(node)
+
+        if self.wealth > 0:
+            self.give_money(network.occupant[neighbors])
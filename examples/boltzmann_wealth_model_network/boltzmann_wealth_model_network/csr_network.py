@@ -0,0 +1,90 @@
+import numpy as np
+
+EMPTY = -1
+
+
+def sparse_gnp_edges(n, p, rng):
+    """Edges of an Erdős-Rényi G(n, p) graph, without looking at all n^2 pairs.
+
+    Instead of flipping a coin for every pair, the gaps between the pairs that are
+    edges are drawn from the geometric distribution (Batagelj & Brandes, 2005). This
+    gives the same distribution, with memory and time proportional to the number of
+    edges.
+
+    Args:
+        n (int): Number of nodes
+        p (float): Probability of an edge between any two nodes
+        rng (np.random.Generator): Source of randomness
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The nodes ``i > j`` of every edge
+    """
+    num_pairs = n * (n - 1) // 2
+    if p <= 0:
+        keys = np.empty(0, dtype=np.int64)
+    elif p >= 1:
+        keys = np.arange(num_pairs, dtype=np.int64)
+    else:
+        batch = int(num_pairs * p + 4 * np.sqrt(num_pairs * p)) + 16
+        chunks = []
+        last = -1
+        while last < num_pairs:
+            chunk = last + np.cumsum(rng.geometric(p, size=batch))
+            chunks.append(chunk)
+            last = chunk[-1]
+        keys = np.concatenate(chunks)
+        keys = keys[keys < num_pairs]
+
+    # Pair k is (i, j) with j < i, in the order (1, 0), (2, 0), (2, 1), (3, 0), ...
+    i = ((1 + np.sqrt(1 + 8 * keys.astype(np.float64))) // 2).astype(np.int64)
+    # Correct for rounding of the square root
+    i -= i * (i - 1) // 2 > keys
+    i += (i + 1) * i // 2 <= keys
+    j = keys - i * (i - 1) // 2
+    return i, j
+
+
+class CSRNetwork:
+    """Undirected network in compressed sparse row form, with one agent per node.
+
+    The neighbors of ``node`` are ``indices[indptr[node]:indptr[node + 1]]``, and
+    ``occupant[node]`` is the index of the agent on the node or ``EMPTY``.
+
+    Attributes:
+        num_nodes (int): Number of nodes
+        indptr (np.ndarray): Start of the neighbors of each node in ``indices``
+        indices (np.ndarray): Neighbors of all nodes, node by node
+        occupant (np.ndarray): Agent index per node, ``EMPTY`` if there is none
+    """
+
+    def __init__(self, num_nodes, sources, targets):
+        """Create a network from its edges.
+
+        Args:
+            num_nodes (int): Number of nodes
+            sources (np.ndarray): One end of every edge
+            targets (np.ndarray): The other end of every edge
+        """
+        dtype = np.int32 if num_nodes < np.iinfo(np.int32).max else np.int64
+        tails = np.concatenate([sources, targets])
+        heads = np.concatenate([targets, sources])
+        order = np.argsort(tails, kind="stable")
+        self.num_nodes = num_nodes
+        self.indices = heads[order].astype(dtype)
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tails, minlength=num_nodes), out=self.indptr[1:])
+        self.occupant = np.full(num_nodes, EMPTY, dtype=dtype)
+
+    @classmethod
+    def gnp(cls, num_nodes, p, rng):
+        """A random G(n, p) network, see ``sparse_gnp_edges``."""
+        return cls(num_nodes, *sparse_gnp_edges(num_nodes, p, rng))
+
+    def neighbors(self, node):
+        return self.indices[self.indptr[node] : self.indptr[node + 1]]
+
+    def move(self, agent_index, source, target):
+        """Move an agent between nodes; ``source`` may be None for a new agent."""
+        if source is not None:
+            self.occupant[source] = EMPTY
+        self.occupant[target] = agent_index
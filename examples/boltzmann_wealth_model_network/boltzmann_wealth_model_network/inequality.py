@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class WealthDistribution:
+    """Histogram of the agents' integer wealth, kept up to date transfer by transfer.
+
+    ``counts[w]`` is the number of agents with wealth ``w``. A transfer of one unit
+    only changes four bins, and the inequality measures are computed from the
+    histogram in O(W), where W is the largest wealth, instead of sorting the wealth of
+    every agent.
+
+    Attributes:
+        counts (np.ndarray): Number of agents per wealth value
+        num_agents (int): Number of agents
+        total (int): Total wealth of all agents
+    """
+
+    def __init__(self, wealths):
+        """Create the histogram.
+
+        Args:
+            wealths: The initial (non-negative, integer) wealth of every agent
+        """
+        wealths = np.asarray(wealths, dtype=np.int64)
+        self.counts = np.bincount(wealths, minlength=2 * (wealths.max(initial=0) + 1))
+        self.num_agents = len(wealths)
+        self.total = int(wealths.sum())
+
+    def transfer(self, giver_wealth, receiver_wealth):
+        """Record that an agent with ``giver_wealth`` gave one unit to an agent with
+        ``receiver_wealth``; both are the wealth before the transfer."""
+        if receiver_wealth + 1 >= len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)])
+        self.counts[giver_wealth] -= 1
+        self.counts[giver_wealth - 1] += 1
+        self.counts[receiver_wealth] -= 1
+        self.counts[receiver_wealth + 1] += 1
+
+    def _bins(self):
+        values = np.flatnonzero(self.counts)
+        return values, self.counts[values]
+
+    def gini(self):
+        """Gini coefficient, as computed from the sorted wealth of all agents."""
+        n = self.num_agents
+        values, counts = self._bins()
+        # The agents of a bin take up the ranks [first, first + count) in sorted order
+        first = np.cumsum(counts) - counts
+        rank_weights = counts * n - counts * (2 * first + counts - 1) / 2
+        b = (values * rank_weights).sum() / (n * self.total)
+        return float(1 + (1 / n) - 2 * b)
+
+    def theil(self):
+        """Theil T index, 0 for perfect equality and ln(n) if one agent owns it all."""
+        values, counts = self._bins()
+        values, counts = values[values > 0], counts[values > 0]
+        shares = values / (self.total / self.num_agents)
+        return float((counts * shares * np.log(shares)).sum() / self.num_agents)
+
+    def top_share(self, fraction=0.1):
+        """Share of the total wealth owned by the richest ``fraction`` of the agents."""
+        k = max(1, int(np.ceil(fraction * self.num_agents)))
+        values, counts = self._bins()
+        values, counts = values[::-1], counts[::-1]
+        # The k richest agents fill up the bins from the top, the last one partly
+        full = np.searchsorted(np.cumsum(counts), k)
+        top = (values[:full] * counts[:full]).sum()
+        top += (k - counts[:full].sum()) * values[full]
+        return float(top / self.total)
@@ -3,32 +3,59 @@ from mesa import Model
 from mesa.datacollection import DataCollector
 from mesa.discrete_space import Network
 
-from .agents import MoneyAgent
+from .agents import CSRMoneyAgent, MoneyAgent
+from .csr_network import CSRNetwork
+from .inequality import WealthDistribution
 
 
 class BoltzmannWealthModelNetwork(Model):
-    """A model with some number of agents."""
+    """A model with some number of agents.
 
-    def __init__(self, n=7, num_nodes=10, seed=None):
+    With ``space="csr"`` the random graph is generated sparsely and stored as a
+    CSRNetwork instead of a networkx graph in a Network space, which makes networks
+    with millions of nodes and a small edge probability ``p`` feasible. There is no
+    grid to visualize in that case.
+    """
+
+    def __init__(self, n=7, num_nodes=10, seed=None, p=0.5, space="network"):
         super().__init__(seed=seed)
+        if space not in ("network", "csr"):
+            raise ValueError(f"Unknown space: {space!r}")
 
         self.num_agents = n
         self.num_nodes = num_nodes if num_nodes >= self.num_agents else self.num_agents
-        self.G = nx.erdos_renyi_graph(n=self.num_nodes, p=0.5)
-        self.grid = Network(self.G, capacity=1, random=self.random)
+        if space == "network":
+            self.G = nx.erdos_renyi_graph(n=self.num_nodes, p=p)
+            self.grid = Network(self.G, capacity=1, random=self.random)
+        else:
+            self.network = CSRNetwork.gnp(self.num_nodes, p, self.rng)
 
         # Set up data collection
         self.datacollector = DataCollector(
-            model_reporters={"Gini": self.compute_gini},
+            model_reporters={
+                "Gini": self.compute_gini,
+                "Theil": self.compute_theil,
+                "Top 10% Share": self.compute_top_share,
+            },
             agent_reporters={"Wealth": "wealth"},
         )
 
         # Create agents; add the agent to a random node
         # TODO: change to MoneyAgent.create_agents(...)
-        list_of_random_nodes = self.random.sample(list(self.G), self.num_agents)
-        for position in list_of_random_nodes:
-            agent = MoneyAgent(self)
-            agent.move_to(self.grid[position])
+        if space == "network":
+            list_of_random_nodes = self.random.sample(list(self.G), self.num_agents)
+            for position in list_of_random_nodes:
+                agent = MoneyAgent(self)
+                agent.move_to(self.grid[position])
+        else:
+            nodes = self.rng.choice(self.num_nodes, self.num_agents, replace=False)
+            self.money_agents = []
+            for index, node in enumerate(nodes.tolist()):
+                self.money_agents.append(CSRMoneyAgent(self, index, node))
+        # Updated by MoneyAgent.give_money on every transfer
+        self.wealth_distribution = WealthDistribution(
+            [agent.wealth for agent in self.agents]
+        )
 
         self.running = True
         self.datacollector.collect(self)
@@ -38,8 +65,10 @@ class BoltzmannWealthModelNetwork(Model):
         self.datacollector.collect(self)  # collect data
 
     def compute_gini(self):
-        agent_wealths = [agent.wealth for agent in self.agents]
-        x = sorted(agent_wealths)
-        num_agents = self.num_agents
-        B = sum(xi * (num_agents - i) for i, xi in enumerate(x)) / (num_agents * sum(x))  # noqa: N806
-        return 1 + (1 / num_agents) - 2 * B
+        return self.wealth_distribution.gini()
+
+    def compute_theil(self):
+        return self.wealth_distribution.theil()
+
+    def compute_top_share(self):
+        return self.wealth_distribution.top_share(0.1)
@@ -0,0 +1,414 @@
+"""A compact cache format for Schelling runs: keyframes, per-step deltas and chunks.
+
+Instead of the full model state at every step, the cache stores the state of the
+agents every ``keyframe_interval`` steps (a keyframe) and, for every step, only the
+agents that moved (a delta). The steps from one keyframe up to the next form a chunk,
+which is compressed on its own. An index of chunk offsets at the end of the file lets
+a reader decompress only the chunk of the step it needs, so reaching any step takes
+at most ``keyframe_interval`` deltas, however long the run. Readers memory-map the
+file, so only the chunks that are actually visited are read from disk.
+
+File layout::
+
+    MAGIC | chunk 0 | chunk 1 | ... | metadata (JSON) | index | step table | trailer
+
+A chunk is a compressed ``.npz`` archive of the keyframe and the deltas of its steps,
+concatenated into flat arrays. The index holds ``(first step, offset, length)`` per
+chunk. The step table holds the chunk, ``happy`` and ``running`` of every step, so the
+model data of a run is available without decompressing anything. The fixed-size
+trailer holds the offsets of the metadata, the index and the step table.
+"""
+
+import atexit
+import io
+import json
+import mmap
+import queue
+import struct
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+MAGIC = b"SCHELLINGCACHE2\n"
+TRAILER = struct.Struct("<QQQQQ")
+STEP_TABLE = np.dtype([("chunk", "<i8"), ("happy", "<i8"), ("running", "?")])
+
+
+def _codecs():
+    codecs = {"zlib": (zlib.compress, zlib.decompress)}
+    if lz4 is not None:
+        codecs["lz4"] = (lz4.frame.compress, lz4.frame.decompress)
+    if zstandard is not None:
+        codecs["zstd"] = (
+            zstandard.ZstdCompressor().compress,
+            zstandard.ZstdDecompressor().decompress,
+        )
+    return codecs
+
+
+def default_codec():
+    """The best available codec: zstd, then lz4, then zlib from the standard library."""
+    codecs = _codecs()
+    return next(codec for codec in ("zstd", "lz4", "zlib") if codec in codecs)
+
+
+def capture_state(model):
+    """The state of a Schelling model that the cache records.
+
+    Agents are listed by ``unique_id``; Schelling never adds or removes agents, so
+    positions of later steps line up with the same agents.
+    """
+    agents = sorted(model.agents, key=lambda agent: agent.unique_id)
+    coordinates = np.array(
+        [agent.cell.coordinate for agent in agents], dtype=np.int32
+    ).reshape(-1, 2)
+    return {
+        "ids": np.array([agent.unique_id for agent in agents], dtype=np.int64),
+        "types": np.array([agent.type for agent in agents], dtype=np.int8),
+        # Cell (x, y) as the single number x * height + y
+        "cells": coordinates[:, 0] * model.height + coordinates[:, 1],
+        "happy": model.happy,
+        "running": model.running,
+    }
+
+
+class CacheWriter:
+    """Write full states step by step as keyframes and deltas."""
+
+    def __init__(self, path, keyframe_interval=100, codec=None, metadata=None):
+        """Create a new cache file.
+
+        Args:
+            path: Path of the cache file
+            keyframe_interval: Number of steps per chunk, each starting with a keyframe
+            codec: "zstd", "lz4" or "zlib"; the best available one if None
+            metadata: JSON-serializable data to store with the run, e.g. model params
+        """
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval must be at least 1")
+        self.codec = codec or default_codec()
+        if self.codec not in _codecs():
+            raise ValueError(f"Codec {self.codec!r} is not available")
+        self._compress = _codecs()[self.codec][0]
+        self.keyframe_interval = keyframe_interval
+        self.metadata = metadata or {}
+        self.num_steps = 0
+        self._file = Path(path).open("wb")  # noqa: SIM115
+        self._file.write(MAGIC)
+        self._index = []
+        self._steps = []
+        self._chunk = None
+        self._previous = None
+
+    def append(self, state):
+        """Add the state of the next step, as returned by ``capture_state``."""
+        step = self.num_steps
+        if step % self.keyframe_interval == 0:
+            self._flush_chunk()
+            self._chunk = {"first_step": step, "keyframe": state, "deltas": []}
+        if self._previous is None:
+            moved = np.empty(0, dtype=np.int32)
+        else:
+            moved = np.flatnonzero(state["cells"] != self._previous["cells"])
+        self._chunk["deltas"].append(
+            (moved, state["cells"][moved], state["happy"], state["running"])
+        )
+        self._steps.append((len(self._index), state["happy"], state["running"]))
+        self._previous = state
+        self.num_steps += 1
+
+    def _flush_chunk(self):
+        if self._chunk is None:
+            return
+        moved, cells, happy, running = zip(*self._chunk["deltas"])
+        keyframe = self._chunk["keyframe"]
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            first_step=self._chunk["first_step"],
+            ids=keyframe["ids"],
+            types=keyframe["types"],
+            cells=keyframe["cells"],
+            # Delta i of the chunk is moved[offsets[i]:offsets[i + 1]]
+            offsets=np.cumsum([0, *map(len, moved)]),
+            moved=np.concatenate(moved).astype(np.int32),
+            moved_cells=np.concatenate(cells).astype(np.int32),
+            happy=np.array(happy, dtype=np.int64),
+            running=np.array(running, dtype=bool),
+        )
+        data = self._compress(buffer.getvalue())
+        self._index.append((self._chunk["first_step"], self._file.tell(), len(data)))
+        self._file.write(data)
+        self._chunk = None
+
+    def close(self):
+        """Write the last chunk, the metadata, the index and the step table."""
+        if self._file.closed:
+            return
+        self._flush_chunk()
+        metadata = {
+            **self.metadata,
+            "codec": self.codec,
+            "keyframe_interval": self.keyframe_interval,
+            "num_steps": self.num_steps,
+        }
+        metadata_offset = self._file.tell()
+        self._file.write(json.dumps(metadata).encode())
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._index, dtype=np.int64).reshape(-1, 3).tobytes())
+        steps_offset = self._file.tell()
+        self._file.write(np.array(self._steps, dtype=STEP_TABLE).tobytes())
+        self._file.write(
+            TRAILER.pack(
+                metadata_offset,
+                index_offset,
+                steps_offset,
+                len(self._index),
+                self.num_steps,
+            )
+        )
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BackgroundCacheWriter:
+    """A CacheWriter that runs in a background thread.
+
+    ``append`` only hands the state to a bounded queue; computing the deltas,
+    compressing the chunks and writing them happens in the writer thread, while the
+    model goes on with the next step. If the writer falls ``max_queue`` states behind,
+    ``append`` blocks until there is room again, so memory use stays bounded.
+
+    ``close`` waits for the queue to be written and completes the file. It is also
+    called at interpreter exit if it wasn't before, so a recording is never left
+    without its index. Errors of the writer thread are raised by the next ``append``
+    or by ``close``.
+    """
+
+    _DONE = object()
+
+    def __init__(self, path, max_queue=16, **kwargs):
+        """Create a new cache file.
+
+        Args:
+            path: Path of the cache file
+            max_queue: Number of states that may wait to be written
+            kwargs: Passed on to CacheWriter
+        """
+        self._writer = CacheWriter(path, **kwargs)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="cache-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while (state := self._queue.get()) is not self._DONE:
+            if self._error is None:
+                try:
+                    self._writer.append(state)
+                except Exception as e:
+                    # Keep draining the queue, so that append never blocks forever
+                    self._error = e
+        if self._error is None:
+            self._writer.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError("Writing the cache failed") from self._error
+
+    def append(self, state):
+        """Queue the state of the next step, blocking while the queue is full."""
+        self._raise_error()
+        if self._closed:
+            raise RuntimeError("The cache is closed")
+        self._queue.put(state)
+
+    def close(self):
+        """Write everything still queued and complete the file."""
+        if not self._closed:
+            self._closed = True
+            atexit.unregister(self.close)
+            self._queue.put(self._DONE)
+            self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CacheReader:
+    """Random access to the states and deltas of any step of a memory-mapped cache.
+
+    Attributes:
+        metadata (dict): Metadata of the run, e.g. the model parameters
+        num_steps (int): Number of recorded steps, including the initial state
+        index (np.ndarray): ``(first step, offset, length)`` of every chunk
+        steps (np.ndarray): ``chunk``, ``happy`` and ``running`` of every step
+    """
+
+    def __init__(self, path):
+        with Path(path).open("rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a Schelling cache file")
+        metadata_offset, index_offset, steps_offset, num_chunks, num_steps = (
+            TRAILER.unpack(self._map[-TRAILER.size :])
+        )
+        self.metadata = json.loads(self._map[metadata_offset:index_offset])
+        # Copied out of the map, so that it can be closed while these are in use
+        self.index = (
+            np.frombuffer(
+                self._map, dtype=np.int64, count=num_chunks * 3, offset=index_offset
+            )
+            .reshape(-1, 3)
+            .copy()
+        )
+        self.steps = np.frombuffer(
+            self._map, dtype=STEP_TABLE, count=num_steps, offset=steps_offset
+        ).copy()
+        self.num_steps = num_steps
+        self.keyframe_interval = self.metadata["keyframe_interval"]
+        self._decompress = _codecs()[self.metadata["codec"]][1]
+        self._cached_chunk = (None, None)
+
+    def _chunk(self, step):
+        if not 0 <= step < self.num_steps:
+            raise IndexError(f"Step {step} is not in the cache")
+        number = int(self.steps["chunk"][step])
+        if self._cached_chunk[0] != number:
+            _, offset, length = self.index[number]
+            data = self._decompress(self._map[offset : offset + length])
+            with np.load(io.BytesIO(data)) as archive:
+                chunk = dict(archive)
+            self._cached_chunk = (number, chunk)
+        return self._cached_chunk[1]
+
+    def delta(self, step):
+        """The agents that moved from ``step - 1`` to ``step`` (none for step 0).
+
+        Returns:
+            dict: ``moved`` (positions of the agents in the state's arrays), their new
+            ``cells``, and ``happy`` and ``running`` of the model at ``step``
+        """
+        chunk = self._chunk(step)
+        i = step - int(chunk["first_step"])
+        start, stop = chunk["offsets"][i], chunk["offsets"][i + 1]
+        return {
+            "moved": chunk["moved"][start:stop],
+            "cells": chunk["moved_cells"][start:stop],
+            "happy": int(chunk["happy"][i]),
+            "running": bool(chunk["running"][i]),
+        }
+
+    def state(self, step):
+        """The full state of ``step``: its keyframe with the deltas up to it applied.
+
+        Returns:
+            dict: ``ids``, ``types`` and ``cells`` of all agents, like
+            ``capture_state``, and ``happy`` and ``running`` of the model
+        """
+        chunk = self._chunk(step)
+        first_step = int(chunk["first_step"])
+        cells = chunk["cells"].copy()
+        for i in range(first_step + 1, step + 1):
+            delta = self.delta(i)
+            cells[delta["moved"]] = delta["cells"]
+        i = step - first_step
+        return {
+            "ids": chunk["ids"],
+            "types": chunk["types"],
+            "cells": cells,
+            "happy": int(chunk["happy"][i]),
+            "running": bool(chunk["running"][i]),
+        }
+
+    def states(self, start=0, stop=None):
+        """Iterate over the full states of the steps ``start`` to ``stop`` (exclusive).
+
+        Only the first state is rebuilt from its keyframe, every following one is the
+        previous state with one delta applied.
+        """
+        stop = self.num_steps if stop is None else min(stop, self.num_steps)
+        if start >= stop:
+            return
+        state = self.state(start)
+        yield state
+        for step in range(start + 1, stop):
+            delta = self.delta(step)
+            cells = state["cells"].copy()
+            cells[delta["moved"]] = delta["cells"]
+            state = {
+                **state,
+                "cells": cells,
+                "happy": delta["happy"],
+                "running": delta["running"],
+            }
+            yield state
+
+    def export(self, directory, start=0, stop=None):
+        """Write the steps ``start`` to ``stop`` (exclusive) as ``.npy`` arrays.
+
+        The directory gets ``cells.npy`` with the cells of all agents per step (one row
+        per step), ``ids.npy`` and ``types.npy`` of the agents, and ``steps.npy`` and
+        ``happy.npy``. ``cells.npy`` is written through a memory map, row by row, so
+        ranges larger than memory can be exported.
+
+        Returns:
+            Path: The directory
+        """
+        stop = self.num_steps if stop is None else min(stop, self.num_steps)
+        if not 0 <= start < stop:
+            raise IndexError(f"Empty or invalid step range {start}:{stop}")
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        cells = None
+        for row, state in enumerate(self.states(start, stop)):
+            if cells is None:
+                cells = np.lib.format.open_memmap(
+                    directory / "cells.npy",
+                    mode="w+",
+                    dtype=state["cells"].dtype,
+                    shape=(stop - start, len(state["cells"])),
+                )
+                np.save(directory / "ids.npy", state["ids"])
+                np.save(directory / "types.npy", state["types"])
+            cells[row] = state["cells"]
+        cells.flush()
+        del cells
+        np.save(directory / "steps.npy", np.arange(start, stop))
+        np.save(directory / "happy.npy", self.steps["happy"][start:stop])
+        return directory
+
+    def close(self):
+        self._cached_chunk = (None, None)
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
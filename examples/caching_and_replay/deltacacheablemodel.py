@@ -0,0 +1,143 @@
+import numpy as np
+from delta_cache import (
+    BackgroundCacheWriter,
+    CacheReader,
+    CacheWriter,
+    capture_state,
+)
+from model import Schelling, SchellingAgent
+
+
+class DeltaCacheableSchelling(Schelling):
+    """The Schelling model, recording its run to a compact cache file or replaying one.
+
+    Unlike CacheableSchelling, which stores the full model state of every step, the
+    cache file only holds a keyframe of all agents every ``keyframe_interval`` steps and
+    the agents that moved in every step, compressed in chunks (see delta_cache.py).
+    This keeps the cache of large grids small and lets replay jump to any step.
+
+    When recording, the cache file is complete once the run has finished (all agents
+    are happy) or ``finish_run`` has been called.
+
+    With ``background_writer=True`` the recorded states are compressed and written by
+    a background thread (see BackgroundCacheWriter), so a step only pays for taking
+    the snapshot; the file is completed at the latest when the interpreter exits.
+
+    When replaying, ``seek`` jumps to any recorded step and ``step_back`` goes one step
+    back; ``replay_start`` starts the replay at a later step. The cache file is memory
+    mapped and only the chunk of the current step is decompressed.
+    """
+
+    def __init__(
+        self,
+        width=20,
+        height=20,
+        density=0.8,
+        minority_pc=0.2,
+        homophily=3,
+        radius=1,
+        cache_file_path="./my_cache_file_path.dcache",
+        replay=False,
+        replay_start=0,
+        keyframe_interval=100,
+        codec=None,
+        background_writer=False,
+        seed=None,
+    ):
+        self.replay = replay
+        if replay:
+            self.cache = CacheReader(cache_file_path)
+            params = self.cache.metadata["model_params"]
+            # The recorded agents are placed below instead of random new ones
+            super().__init__(
+                height=params["height"],
+                width=params["width"],
+                homophily=params["homophily"],
+                radius=params["radius"],
+                density=0,
+                minority_pc=params["minority_pc"],
+                seed=seed,
+            )
+            # Schelling already collected the data of its empty grid
+            for values in self.datacollector.model_vars.values():
+                values.clear()
+            state = self.cache.state(0)
+            self.replay_agents = [
+                SchellingAgent(self, int(agent_type)) for agent_type in state["types"]
+            ]
+            self._replay_cells = np.full(len(self.replay_agents), -1, dtype=np.int32)
+            self._apply(range(len(self.replay_agents)), state)
+            if replay_start:
+                self.seek(replay_start)
+        else:
+            super().__init__(
+                height=height,
+                width=width,
+                homophily=homophily,
+                radius=radius,
+                density=density,
+                minority_pc=minority_pc,
+                seed=seed,
+            )
+            model_params = {
+                "height": height,
+                "width": width,
+                "homophily": homophily,
+                "radius": radius,
+                "density": density,
+                "minority_pc": minority_pc,
+            }
+            writer = BackgroundCacheWriter if background_writer else CacheWriter
+            self.cache = writer(
+                cache_file_path,
+                keyframe_interval=keyframe_interval,
+                codec=codec,
+                metadata={"model_params": model_params},
+            )
+            self.cache.append(capture_state(self))
+
+    def _apply(self, agent_indices, state):
+        """Move replayed agents to their recorded cells and restore the counters."""
+        for index, cell in zip(agent_indices, state["cells"].tolist()):
+            self.replay_agents[index].cell = self.grid[divmod(cell, self.height)]
+        self._replay_cells[agent_indices] = state["cells"]
+        self.happy = state["happy"]
+        self.running = state["running"]
+        self.datacollector.collect(self)
+
+    def step(self):
+        if self.replay:
+            if self.steps >= self.cache.num_steps:
+                # Stay on the last recorded step, Mesa already counted this one
+                self.steps = self.cache.num_steps - 1
+                self.running = False
+                return
+            delta = self.cache.delta(self.steps)
+            self._apply(delta["moved"].tolist(), delta)
+        else:
+            super().step()
+            self.cache.append(capture_state(self))
+            if not self.running:
+                self.finish_run()
+
+    def seek(self, step):
+        """Show the recorded state of ``step``, moving only agents that are elsewhere."""
+        if not self.replay:
+            raise RuntimeError("Only a replayed run can seek")
+        state = self.cache.state(step)
+        moved = np.flatnonzero(state["cells"] != self._replay_cells)
+        self.steps = step
+        # The data of the steps up to here comes straight from the step table
+        self.datacollector.model_vars["happy"] = self.cache.steps["happy"][
+            :step
+        ].tolist()
+        self._apply(moved, {**state, "cells": state["cells"][moved]})
+
+    def step_back(self):
+        """Go back to the previous recorded step."""
+        if self.steps > 0:
+            self.seek(self.steps - 1)
+
+    def finish_run(self):
+        """Complete the cache file; the run can't be recorded any further."""
+        self.cache.close()
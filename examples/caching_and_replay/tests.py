@@ -0,0 +1,88 @@
+import numpy as np
+from delta_cache import CacheReader, capture_state
+from deltacacheablemodel import DeltaCacheableSchelling
+
+NUM_STEPS = 12
+# Small chunks, so that the run spans several keyframes
+KEYFRAME_INTERVAL = 5
+
+
+def record(path, **kwargs):
+    """Record a short seeded run and return the state of every step."""
+    model = DeltaCacheableSchelling(
+        cache_file_path=path, keyframe_interval=KEYFRAME_INTERVAL, seed=42, **kwargs
+    )
+    states = [capture_state(model)]
+    while model.running and model.steps < NUM_STEPS:
+        model.step()
+        states.append(capture_state(model))
+    model.finish_run()
+    return states
+
+
+def assert_same_state(state, expected):
+    assert (state["cells"] == expected["cells"]).all()
+    assert (state["types"] == expected["types"]).all()
+    assert state["happy"] == expected["happy"]
+
+
+def test_cache_round_trip(tmp_path):
+    path = tmp_path / "run.dcache"
+    states = record(path)
+    with CacheReader(path) as cache:
+        assert cache.num_steps == len(states) == NUM_STEPS + 1
+        for step, expected in enumerate(states):
+            assert_same_state(cache.state(step), expected)
+
+    # Replaying moves the agents to the recorded cells step by step
+    replay = DeltaCacheableSchelling(cache_file_path=path, replay=True)
+    assert_same_state(capture_state(replay), states[0])
+    for expected in states[1:]:
+        replay.step()
+        assert_same_state(capture_state(replay), expected)
+
+
+def test_seek_states_and_export(tmp_path):
+    path = tmp_path / "run.dcache"
+    states = record(path)
+    replay = DeltaCacheableSchelling(cache_file_path=path, replay=True)
+    # Forward and backward, within and across chunks
+    for step in (7, 12, 3, 4, 0, 11):
+        replay.seek(step)
+        assert replay.steps == step
+        assert_same_state(capture_state(replay), states[step])
+    replay.step_back()
+    assert replay.steps == 10
+    assert_same_state(capture_state(replay), states[10])
+    replay.step()
+    assert_same_state(capture_state(replay), states[11])
+    # Stepping past the end stays on the last step
+    for _ in range(3):
+        replay.step()
+    assert replay.steps == NUM_STEPS
+    assert not replay.running
+    replay.step_back()
+    assert_same_state(capture_state(replay), states[NUM_STEPS - 1])
+
+    late = DeltaCacheableSchelling(cache_file_path=path, replay=True, replay_start=6)
+    assert_same_state(capture_state(late), states[6])
+
+    with CacheReader(path) as cache:
+        for state, expected in zip(cache.states(3, 9), states[3:9], strict=True):
+            assert_same_state(state, expected)
+        directory = cache.export(tmp_path / "export", 4, 11)
+    cells = np.load(directory / "cells.npy")
+    assert (cells == [state["cells"] for state in states[4:11]]).all()
+    assert (np.load(directory / "steps.npy") == np.arange(4, 11)).all()
+    assert (
+        np.load(directory / "happy.npy") == [s["happy"] for s in states[4:11]]
+    ).all()
+
+
+def test_background_writer_writes_the_same_file(tmp_path):
+    states = record(tmp_path / "run.dcache")
+    background_states = record(tmp_path / "background.dcache", background_writer=True)
+    for state, expected in zip(background_states, states, strict=True):
+        assert_same_state(state, expected)
+    written = (tmp_path / "background.dcache").read_bytes()
+    assert written == (tmp_path / "run.dcache").read_bytes()
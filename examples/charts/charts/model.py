@@ -23,54 +23,68 @@ For details see batch_run.py in the same directory as run.py.
 # Start of datacollector functions
 
 
+def get_summary(model):
+    """Class counts and money totals of all people, computed once per step.
+
+    All the reporters below read from this summary, so the people are only gathered
+    once per collection, however many columns are reported.
+    """
+    cached = getattr(model, "_summary", None)
+    if cached is not None and cached[0] == model.steps:
+        return cached[1]
+
+    agents = list(model.agents)
+    savings = np.array([a.savings for a in agents])
+    wallets = np.array([a.wallet for a in agents])
+    loans = np.array([a.loans for a in agents])
+    summary = {
+        "Rich": int(np.count_nonzero(savings > model.rich_threshold)),
+        "Poor": int(np.count_nonzero(loans > 10)),
+        "Middle Class": int(
+            np.count_nonzero((loans < 10) & (savings < model.rich_threshold))
+        ),
+        "Savings": savings.sum(),
+        "Wallets": wallets.sum(),
+        "Loans": loans.sum(),
+    }
+    summary["Money"] = summary["Wallets"] + summary["Savings"]
+    model._summary = (model.steps, summary)
+    return summary
+
+
 def get_num_rich_agents(model):
     """Return number of rich agents"""
-    rich_agents = [a for a in model.agents if a.savings > model.rich_threshold]
-    return len(rich_agents)
+    return get_summary(model)["Rich"]
 
 
 def get_num_poor_agents(model):
     """Return number of poor agents"""
-    poor_agents = [a for a in model.agents if a.loans > 10]
-    return len(poor_agents)
+    return get_summary(model)["Poor"]
 
 
 def get_num_mid_agents(model):
     """Return number of middle class agents"""
-    mid_agents = [
-        a for a in model.agents if a.loans < 10 and a.savings < model.rich_threshold
-    ]
-    return len(mid_agents)
+    return get_summary(model)["Middle Class"]
 
 
 def get_total_savings(model):
     """Sum of all agents' savings"""
-    agent_savings = [a.savings for a in model.agents]
-    # return the sum of agents' savings
-    return np.sum(agent_savings)
+    return get_summary(model)["Savings"]
 
 
 def get_total_wallets(model):
     """Sum of amounts of all agents' wallets"""
-    agent_wallets = [a.wallet for a in model.agents]
-    # return the sum of all agents' wallets
-    return np.sum(agent_wallets)
+    return get_summary(model)["Wallets"]
 
 
 def get_total_money(model):
-    # sum of all agents' wallets
-    wallet_money = get_total_wallets(model)
-    # sum of all agents' savings
-    savings_money = get_total_savings(model)
-    # return sum of agents' wallets and savings for total money
-    return wallet_money + savings_money
+    """Sum of all agents' wallets and savings"""
+    return get_summary(model)["Money"]
 
 
 def get_total_loans(model):
-    # list of amounts of all agents' loans
-    agent_loans = [a.loans for a in model.agents]
-    # return sum of all agents' loans
-    return np.sum(agent_loans)
+    """Sum of all agents' loans"""
+    return get_summary(model)["Loans"]
 
 
 class Charts(mesa.Model):
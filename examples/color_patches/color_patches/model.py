@@ -5,6 +5,7 @@ The model - a 2D lattice where agents live and have an opinion
 from collections import Counter
 
 import mesa
+import numpy as np
 from mesa.discrete_space.cell_agent import (
     CellAgent,
 )
@@ -12,6 +13,8 @@ from mesa.discrete_space.grid import (
     OrthogonalMooreGrid,
 )
 
+from .vectorized import majority_vote
+
 
 class ColorCell(CellAgent):
     """
@@ -64,14 +67,30 @@ class ColorCell(CellAgent):
 class ColorPatches(mesa.Model):
     """
     represents a 2D lattice where agents live
+
+    With engine="arrays" there are no agents and no grid: the opinions live in the
+    int8 array self.opinions of shape (width, height), and a step is computed for the
+    whole lattice at once (see vectorized.py). This makes lattices of millions of
+    cells feasible, with the same dynamics as the agent version.
     """
 
-    def __init__(self, width=20, height=20):
+    def __init__(self, width=20, height=20, engine="agents", seed=None):
         """
         Create a 2D lattice with strict borders where agents live
         The agents next state is first determined before updating the grid
         """
-        super().__init__()
+        super().__init__(seed=seed)
+        if engine not in ("agents", "arrays"):
+            raise ValueError(f"Unknown engine: {engine!r}")
+        self.engine = engine
+        self.running = True
+        if engine == "arrays":
+            self._grid = None
+            self.opinions = self.rng.integers(
+                0, len(ColorCell.OPINIONS), size=(width, height), dtype=np.int8
+            )
+            return
+
         self._grid = OrthogonalMooreGrid(
             (width, height), torus=False, random=self.random
         )
@@ -93,6 +112,11 @@ class ColorPatches(mesa.Model):
         - First, all agents determine their next opinion based on their neighbors current opinions
         - Then, all agents update their opinion to the next opinion
         """
+        if self.engine == "arrays":
+            self.opinions = majority_vote(
+                self.opinions, len(ColorCell.OPINIONS), self.rng
+            )
+            return
         self.agents.do("determine_opinion")
         self.agents.do("assume_opinion")
 
@@ -0,0 +1,54 @@
+"""
+Array version of the color patches step, for large lattices
+"""
+
+import numpy as np
+
+# Rows of the lattice processed at once; small enough for the per-opinion counts of a
+# block to stay in the CPU cache
+BLOCK = 16
+
+
+def majority_vote(opinions, num_opinions, rng):
+    """
+    Return the next opinion of every cell: the most common opinion among its (up to)
+    8 neighbors, with ties broken uniformly at random, like
+    ColorCell.determine_opinion. The borders are strict, as in the agent version.
+
+    The lattice is processed in blocks of rows. For each block the neighbor counts of
+    all opinions come from a one-hot encoding and a separable 3x3 box sum; among the
+    opinions with the highest count the cell takes the one with a random rank.
+    """
+    width, height = opinions.shape
+    values = np.arange(num_opinions, dtype=opinions.dtype)[:, None, None]
+    # -1 is no opinion, so the cells beyond the border count for none
+    padded = np.full((width + 2, height + 2), -1, dtype=opinions.dtype)
+    padded[1:-1, 1:-1] = opinions
+    draws = rng.random(opinions.shape, dtype=np.float32)
+    next_opinions = np.empty_like(opinions)
+    rank = np.empty((num_opinions, BLOCK, height), dtype=np.uint8)
+
+    for start in range(0, width, BLOCK):
+        stop = min(start + BLOCK, width)
+        one_hot = (padded[None, start : stop + 2] == values).view(np.uint8)
+        rows = one_hot[:, :, :-2] + one_hot[:, :, 1:-1]
+        rows += one_hot[:, :, 2:]
+        counts = rows[:, :-2] + rows[:, 1:-1]
+        counts += rows[:, 2:]
+        counts -= one_hot[:, 1:-1, 1:-1]
+
+        tied = (counts == counts.max(axis=0)).view(np.uint8)
+        # rank[k] is the number of tied opinions up to and including opinion k
+        block_rank = rank[:, : stop - start]
+        block_rank[0] = tied[0]
+        for opinion in range(1, num_opinions):
+            np.add(block_rank[opinion - 1], tied[opinion], out=block_rank[opinion])
+        num_tied = block_rank[-1]
+        pick = (draws[start:stop] * num_tied).astype(np.uint8)
+        # Guard against float rounding of draws just below 1
+        np.minimum(pick, num_tied - 1, out=pick)
+        chosen = (block_rank == pick + 1) & tied.view(bool)
+        next_opinions[start:stop] = (chosen.view(np.uint8) * values).sum(
+            axis=0, dtype=opinions.dtype
+        )
+    return next_opinions
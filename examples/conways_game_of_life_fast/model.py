@@ -1,3 +1,8 @@
+import os
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from mesa import Model
 from mesa.datacollection import DataCollector
@@ -5,26 +10,577 @@ from mesa.space import PropertyLayer
 from scipy.signal import convolve2d
 
 
+def pack_cells(cells):
+    """Pack a bool (width, height) array into uint64 words, 64 cells of a column per word.
+
+    Cell (x, y) is bit y % 64 of word (x, y // 64).
+    """
+    width, height = cells.shape
+    packed = np.packbits(cells, axis=1, bitorder="little")
+    words = np.zeros((width, -(-height // 64) * 8), dtype=np.uint8)
+    words[:, : packed.shape[1]] = packed
+    return words.view("<u8")
+
+
+def unpack_cells(words, height):
+    """The bool (width, height) array of cells packed by pack_cells."""
+    cells = np.unpackbits(words.view(np.uint8), axis=1, count=height, bitorder="little")
+    return cells.view(bool)
+
+
+def bitpacked_step(words, height):
+    """Advance packed cells by one generation on a torus.
+
+    Neighbors are counted for 64 cells at once with a bit-sliced adder: every count is
+    held in bit planes (one bit of the count per word array), and the rules are applied
+    as logic on those planes.
+    """
+    # Cells beyond the height in the last word of every column
+    last_bits = height - 64 * (words.shape[1] - 1)
+    mask = np.uint64(2**last_bits - 1)
+    one, top = np.uint64(1), np.uint64(last_bits - 1)
+
+    # The neighbors at y - 1 and y + 1, wrapping around at the height
+    below = words << one
+    below[:, 1:] |= words[:, :-1] >> np.uint64(63)
+    below[:, 0] |= (words[:, -1] >> top) & one
+    below[:, -1] &= mask
+    above = words >> one
+    above[:, :-1] |= (words[:, 1:] & one) << np.uint64(63)
+    above[:, -1] &= mask
+    above[:, -1] |= (words[:, 0] & one) << top
+
+    # Alive cells among the 3 cells of a row (2 bits), and among the 2 of the own row
+    row_xor = below ^ above
+    row0 = row_xor ^ words
+    row1 = (below & above) | (words & row_xor)
+    own0 = row_xor
+    own1 = below & above
+    # Rows x - 1 and x + 1, wrapping around at the width
+    left0, left1 = np.roll(row0, 1, axis=0), np.roll(row1, 1, axis=0)
+    right0, right1 = np.roll(row0, -1, axis=0), np.roll(row1, -1, axis=0)
+
+    # count = sum0 + 2 * (number of set bits among left1, right1, own1, carry)
+    side0 = left0 ^ right0
+    sum0 = side0 ^ own0
+    carry = (left0 & right0) | (own0 & side0)
+    side1 = left1 ^ right1
+    low1 = own1 ^ carry
+    sum1 = side1 ^ low1
+    at_least_two = (left1 & right1) | (own1 & carry) | (side1 & low1)
+
+    # Alive with 3 neighbors, or alive and 2 neighbors (counts of 8 wrap to 0)
+    alive = sum1 & ~at_least_two & (sum0 | words)
+    alive[:, -1] &= mask
+    return alive
+
+
+class BitPackedLayer(PropertyLayer):
+    """A bool PropertyLayer that stores its cells packed, 64 per uint64 word.
+
+    The packed ``words`` are what the model steps. ``data`` unpacks them into the usual
+    bool array on demand (e.g. for drawing) and keeps it until the next step, which
+    packs it again, so in-place changes to ``data`` are kept like with PropertyLayer.
+    """
+
+    def __init__(self, name, width, height):
+        # Not calling PropertyLayer.__init__, which would allocate the unpacked array
+        self.name = name
+        self.width = width
+        self.height = height
+        self.words = np.zeros((width, -(-height // 64)), dtype=np.uint64)
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = unpack_cells(self.words, self.height)
+        return self._data
+
+    @data.setter
+    def data(self, cells):
+        self.words = pack_cells(np.asarray(cells, dtype=bool))
+        self._data = None
+
+    def step(self):
+        """Advance the cells by one generation."""
+        if self._data is not None:
+            self.words = pack_cells(self._data)
+            self._data = None
+        self.words = bitpacked_step(self.words, self.height)
+
+    def count(self):
+        """Number of alive cells."""
+        if hasattr(np, "bitwise_count"):
+            return int(np.bitwise_count(self.words).sum())
+        # NumPy < 2 has no popcount
+        return int(np.unpackbits(self.words.view(np.uint8)).sum())
+
+
+class TileScheduler:
+    """Steps a bool board of cells on a torus, recomputing only the tiles that can change.
+
+    The board is split into square tiles. A tile can only change if it or one of its 8
+    neighboring tiles changed in the previous step, so only those tiles are recomputed;
+    tiles that are dead or hold still lifes cost nothing once their surroundings settle.
+
+    Attributes:
+        tile_size (int): Width and height of a tile, in cells
+        changed (np.ndarray): Per tile, whether any of its cells changed last step
+        active_tiles (int): Number of tiles recomputed in the last step
+        alive_count (int): Number of alive cells, kept up to date tile by tile
+    """
+
+    def __init__(self, cells, tile_size=64):
+        if tile_size < 1:
+            raise ValueError("tile_size must be at least 1")
+        width, height = cells.shape
+        self.tile_size = tile_size
+        # Every tile counts as changed at first, so the first step computes all of them
+        self.changed = np.ones(
+            (-(-width // tile_size), -(-height // tile_size)), dtype=bool
+        )
+        self.active_tiles = 0
+        self.alive_count = int(cells.sum())
+
+    def activate_all(self, cells):
+        """Recompute every tile in the next step, e.g. after cells were edited directly."""
+        self.changed[:] = True
+        self.alive_count = int(cells.sum())
+
+    def step(self, cells):
+        """Advance ``cells`` by one generation, in place."""
+        width, height = cells.shape
+        size = self.tile_size
+        active = self.changed.copy()
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                active |= np.roll(self.changed, (dx, dy), axis=(0, 1))
+
+        updates = []
+        self.changed[:] = False
+        for tx, ty in np.argwhere(active):
+            x0, y0 = tx * size, ty * size
+            x1, y1 = min(x0 + size, width), min(y0 + size, height)
+            # The tile with a border of one cell, wrapping around the edges of the board
+            rows = np.arange(x0 - 1, x1 + 1) % width
+            columns = np.arange(y0 - 1, y1 + 1) % height
+            block = cells[rows[:, None], columns].view(np.uint8)
+            neighbors = block[:-2, :-2] + block[:-2, 1:-1]
+            for dx, dy in ((0, 2), (1, 0), (1, 2), (2, 0), (2, 1), (2, 2)):
+                neighbors += block[dx : dx + x1 - x0, dy : dy + y1 - y0]
+            old = block[1:-1, 1:-1].view(bool)
+            new = (neighbors == 3) | (old & (neighbors == 2))
+            if (new != old).any():
+                self.changed[tx, ty] = True
+                self.alive_count += int(new.sum()) - int(old.sum())
+                updates.append((x0, x1, y0, y1, new))
+
+        # Write the new tiles only after all tiles were computed from the old cells
+        for x0, x1, y0, y1, new in updates:
+            cells[x0:x1, y0:y1] = new
+        self.active_tiles = int(active.sum())
+
+
+class Node:
+    """A canonical quadtree node of 2^level x 2^level cells.
+
+    Nodes are created only through HashLife.join, so two nodes with the same cells are
+    the same object and can be compared and hashed by identity.
+    """
+
+    __slots__ = ("__weakref__", "level", "ne", "nw", "population", "se", "sw")
+
+    def __init__(self, level, nw, ne, sw, se, population):
+        self.level = level
+        self.nw, self.ne, self.sw, self.se = nw, ne, sw, se
+        self.population = population
+
+
+class HashLife:
+    """Gosper's HashLife on a torus of 2^p x 2^p cells.
+
+    Boards are quadtrees of canonical nodes, so repeated patterns are stored once, and
+    the successor of a node, its center 2^j generations later, is memoized. A node
+    that was seen before is advanced with a single lookup, however many generations
+    that is.
+
+    The torus is simulated by tiling it: a quadtree of copies of the board evolves like
+    the torus, and any aligned copy in the result is the board after that many
+    generations. The copies are all the same node, so tiling costs only a few nodes per
+    level.
+
+    Attributes:
+        max_cache (int): Number of memoized successors kept; the least recently used
+            ones are evicted first.
+    """
+
+    def __init__(self, max_cache=2**20):
+        self.max_cache = max_cache
+        self._results = OrderedDict()
+        # Nodes stay canonical as long as anything refers to them
+        self._nodes = weakref.WeakValueDictionary()
+        self.off = Node(0, None, None, None, None, 0)
+        self.on = Node(0, None, None, None, None, 1)
+        self._empty = [self.off]
+
+    def join(self, nw, ne, sw, se):
+        """The canonical node made of four nodes of the same level."""
+        key = (nw, ne, sw, se)
+        node = self._nodes.get(key)
+        if node is None:
+            population = nw.population + ne.population + sw.population + se.population
+            node = Node(nw.level + 1, nw, ne, sw, se, population)
+            self._nodes[key] = node
+        return node
+
+    def empty(self, level):
+        while len(self._empty) <= level:
+            smaller = self._empty[-1]
+            self._empty.append(self.join(smaller, smaller, smaller, smaller))
+        return self._empty[level]
+
+    def from_array(self, cells):
+        """The node of a square bool array with a side of 2^p cells.
+
+        Equal blocks are found with np.unique level by level, so only distinct blocks
+        are joined in Python.
+        """
+        nodes = [self.off, self.on]
+        ids = cells.astype(np.int64)
+        while ids.shape[0] > 1:
+            # Number the distinct (nw, ne) and (sw, se) pairs, then the distinct quads
+            n = len(nodes)
+            top, top_ids = np.unique(
+                ids[0::2, 0::2] * n + ids[0::2, 1::2], return_inverse=True
+            )
+            bottom, bottom_ids = np.unique(
+                ids[1::2, 0::2] * n + ids[1::2, 1::2], return_inverse=True
+            )
+            quads, ids = np.unique(
+                top_ids * len(bottom) + bottom_ids, return_inverse=True
+            )
+            top_index, bottom_index = np.divmod(quads, len(bottom))
+            nw, ne = np.divmod(top[top_index], n)
+            sw, se = np.divmod(bottom[bottom_index], n)
+            nodes = [
+                self.join(nodes[a], nodes[b], nodes[c], nodes[d])
+                for a, b, c, d in zip(
+                    nw.tolist(), ne.tolist(), sw.tolist(), se.tolist()
+                )
+            ]
+        return nodes[ids[0, 0]]
+
+    def to_array(self, node):
+        """The cells of a node as a square bool array, the reverse of from_array."""
+        nodes = [node]
+        ids = np.zeros((1, 1), dtype=np.int64)
+        for _ in range(node.level):
+            # Number the distinct children of the distinct nodes of this level
+            index = {}
+            quads = [
+                [
+                    index.setdefault(child, len(index))
+                    for child in (n.nw, n.ne, n.sw, n.se)
+                ]
+                for n in nodes
+            ]
+            quads = np.array(quads, dtype=np.int64)
+            side = 2 * len(ids)
+            children = np.empty((side, side), dtype=np.int64)
+            children[0::2, 0::2] = quads[ids, 0]
+            children[0::2, 1::2] = quads[ids, 1]
+            children[1::2, 0::2] = quads[ids, 2]
+            children[1::2, 1::2] = quads[ids, 3]
+            nodes, ids = list(index), children
+        populations = np.array([n.population for n in nodes], dtype=bool)
+        return populations[ids]
+
+    def advance(self, board, k):
+        """The torus ``board`` (a node) after 2^k generations."""
+        # A tiling with room for 2^k generations, whose center quadrants are aligned
+        # with the copies of the board
+        tiles = board
+        while tiles.level < max(board.level, k) + 2:
+            tiles = self.join(tiles, tiles, tiles, tiles)
+        result = self.successor(tiles, k)
+        while result.level > board.level:
+            result = result.nw
+        return result
+
+    def successor(self, node, j):
+        """The center of ``node`` (level n >= 2) after 2^j generations, j <= n - 2."""
+        if node.population == 0:
+            return node.nw
+        key = (node, j)
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+            return result
+
+        if node.level == 2:
+            result = self._life_4x4(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            join = self.join
+            # Nine overlapping subnodes of half the size
+            nine = (
+                nw,
+                join(nw.ne, ne.nw, nw.se, ne.sw),
+                ne,
+                join(nw.sw, nw.se, sw.nw, sw.ne),
+                join(nw.se, ne.sw, sw.ne, se.nw),
+                join(ne.sw, ne.se, se.nw, se.ne),
+                sw,
+                join(sw.ne, se.nw, sw.se, se.sw),
+                se,
+            )
+            if j == node.level - 2:
+                # Half of the generations now, the other half below
+                j -= 1
+                r = [self.successor(sub, j) for sub in nine]
+            else:
+                r = [join(sub.nw.se, sub.ne.sw, sub.sw.ne, sub.se.nw) for sub in nine]
+            result = join(
+                self.successor(join(r[0], r[1], r[3], r[4]), j),
+                self.successor(join(r[1], r[2], r[4], r[5]), j),
+                self.successor(join(r[3], r[4], r[6], r[7]), j),
+                self.successor(join(r[4], r[5], r[7], r[8]), j),
+            )
+
+        self._results[key] = result
+        if len(self._results) > self.max_cache:
+            self._results.popitem(last=False)
+        return result
+
+    def _life_4x4(self, node):
+        """The center 2 x 2 cells of a 4 x 4 node one generation later."""
+        cells = [
+            [node.nw.nw, node.nw.ne, node.ne.nw, node.ne.ne],
+            [node.nw.sw, node.nw.se, node.ne.sw, node.ne.se],
+            [node.sw.nw, node.sw.ne, node.se.nw, node.se.ne],
+            [node.sw.sw, node.sw.se, node.se.sw, node.se.se],
+        ]
+        alive = [[cell.population for cell in row] for row in cells]
+        center = []
+        for x in (1, 2):
+            for y in (1, 2):
+                neighbors = sum(
+                    alive[x + dx][y + dy]
+                    for dx in (-1, 0, 1)
+                    for dy in (-1, 0, 1)
+                    if dx or dy
+                )
+                lives = neighbors == 3 or (alive[x][y] and neighbors == 2)
+                center.append(self.on if lives else self.off)
+        return self.join(*center)
+
+
+class HashLifeLayer(PropertyLayer):
+    """A bool PropertyLayer whose cells are a HashLife quadtree.
+
+    Both sides must be powers of two. ``data`` converts the quadtree to the usual bool
+    array on demand and keeps it until the next advance, which converts it back, so
+    in-place changes to ``data`` are kept like with PropertyLayer.
+    """
+
+    def __init__(self, name, width, height, max_cache=2**20):
+        for side in (width, height):
+            if side < 1 or side & (side - 1):
+                raise ValueError(
+                    "HashLife needs a width and height that are powers of two"
+                )
+        # Not calling PropertyLayer.__init__, which would allocate the unpacked array
+        self.name = name
+        self.width = width
+        self.height = height
+        self.hashlife = HashLife(max_cache)
+        # The board is a square of the larger side, holding copies of the torus
+        self.side = max(width, height)
+        self.copies = (self.side // width) * (self.side // height)
+        self.board = self.hashlife.empty(self.side.bit_length() - 1)
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self.hashlife.to_array(self.board)[: self.width, : self.height]
+        return self._data
+
+    @data.setter
+    def data(self, cells):
+        cells = np.asarray(cells, dtype=bool)
+        tiles = (self.side // self.width, self.side // self.height)
+        self.board = self.hashlife.from_array(np.tile(cells, tiles))
+        self._data = None
+
+    def advance(self, k):
+        """Advance the cells by 2^k generations."""
+        if self._data is not None:
+            self.data = self._data
+        self.board = self.hashlife.advance(self.board, k)
+
+    def count(self):
+        """Number of alive cells."""
+        return self.board.population // self.copies
+
+
+class StripedStepper:
+    """Steps a bool board of cells on a torus in horizontal stripes, one thread each.
+
+    Every stripe copies its rows plus a halo of one row above and below from the
+    current board into its own padded buffer, counts neighbors there and writes its
+    rows of the next board. NumPy releases the GIL in these operations, so the stripes
+    run in parallel. All buffers are allocated once: the board and the next board are
+    swapped every step (double buffering).
+
+    Attributes:
+        num_threads (int): Number of stripes and threads
+    """
+
+    def __init__(self, width, height, num_threads=None):
+        self.num_threads = min(num_threads or os.cpu_count() or 1, width)
+        bounds = np.linspace(0, width, self.num_threads + 1).astype(int)
+        self.stripes = list(zip(bounds[:-1], bounds[1:]))
+        self.padded = [
+            np.empty((x1 - x0 + 2, height + 2), dtype=np.uint8)
+            for x0, x1 in self.stripes
+        ]
+        self.counts = [
+            np.empty((x1 - x0, height), dtype=np.uint8) for x0, x1 in self.stripes
+        ]
+        self.masks = [
+            np.empty((x1 - x0, height), dtype=bool) for x0, x1 in self.stripes
+        ]
+        self.spare = np.empty((width, height), dtype=bool)
+        self._pool = ThreadPoolExecutor(self.num_threads)
+
+    def step(self, cells):
+        """Return the next generation of ``cells``, which becomes the spare buffer.
+
+        Returns:
+            tuple[np.ndarray, int]: The next board and its number of alive cells
+        """
+        board, self.spare = self.spare, cells
+        alive = self._pool.map(
+            self._step_stripe,
+            range(self.num_threads),
+            [cells] * self.num_threads,
+            [board] * self.num_threads,
+        )
+        return board, sum(alive)
+
+    def _step_stripe(self, stripe, cells, board):
+        x0, x1 = self.stripes[stripe]
+        width = len(cells)
+        padded = self.padded[stripe]
+        # Halo exchange: the rows next to the stripe, wrapping around the torus
+        padded[1:-1, 1:-1] = cells[x0:x1]
+        padded[0, 1:-1] = cells[x0 - 1]
+        padded[-1, 1:-1] = cells[x1 % width]
+        padded[:, 0] = padded[:, -2]
+        padded[:, -1] = padded[:, 1]
+
+        neighbors = self.counts[stripe]
+        np.add(padded[:-2, :-2], padded[:-2, 1:-1], out=neighbors)
+        for dx, dy in ((0, 2), (1, 0), (1, 2), (2, 0), (2, 1), (2, 2)):
+            neighbors += padded[dx : dx + x1 - x0, dy : dy + neighbors.shape[1]]
+
+        # Alive with 3 neighbors, or alive and 2 neighbors
+        new, survives = board[x0:x1], self.masks[stripe]
+        np.equal(neighbors, 3, out=new)
+        np.equal(neighbors, 2, out=survives)
+        survives &= cells[x0:x1]
+        new |= survives
+        return int(np.count_nonzero(new))
+
+
 # fmt: off
 class GameOfLifeModel(Model):
-    def __init__(self, width=10, height=10, alive_fraction=0.2):
+    """Conway's Game of Life on a torus, with the cells in a PropertyLayer.
+
+    With engine="bitpacked" the cells are stored 64 per uint64 word in a BitPackedLayer
+    and stepped with word-parallel logic, which is much faster and uses 8x less memory
+    than the bool array of the default engine="convolve".
+
+    With engine="tiled" the board is split into tiles of tile_size x tile_size cells and
+    only the tiles near last step's changes are recomputed, see TileScheduler. The
+    number of recomputed tiles is collected as "Active tiles". After changing
+    cell_layer.data directly, call scheduler.activate_all(cell_layer.data).
+
+    With engine="hashlife" the cells are a HashLifeLayer and every step advances
+    2^step_exponent generations, so the data is collected every 2^step_exponent
+    generations. The width and height must be powers of two. ``generation`` counts the
+    generations for all engines.
+
+    With engine="striped" the board is stepped in num_threads horizontal stripes in
+    parallel, see StripedStepper (all CPUs if num_threads is None).
+    """
+
+    def __init__(self, width=10, height=10, alive_fraction=0.2, engine="convolve", tile_size=64, step_exponent=0, num_threads=None):
         super().__init__()
+        if engine not in ("convolve", "bitpacked", "tiled", "hashlife", "striped"):
+            raise ValueError(f"Unknown engine: {engine!r}")
+        self.engine = engine
         # Initialize the property layer for cell states
-        self.cell_layer = PropertyLayer("cells", width, height, False, dtype=bool)
+        if engine == "bitpacked":
+            self.cell_layer = BitPackedLayer("cells", width, height)
+        elif engine == "hashlife":
+            self.cell_layer = HashLifeLayer("cells", width, height)
+        else:
+            self.cell_layer = PropertyLayer("cells", width, height, False, dtype=bool)
         # Randomly set cells to alive
         self.cell_layer.data = np.random.choice([True, False], size=(width, height), p=[alive_fraction, 1 - alive_fraction])
 
+        if engine == "tiled":
+            self.scheduler = TileScheduler(self.cell_layer.data, tile_size)
+        elif engine == "striped":
+            self.stepper = StripedStepper(width, height, num_threads)
+
+        self.step_exponent = step_exponent
+        self.generation = 0
+
         # Metrics and datacollector
         self.cells = width * height
         self.alive_count = 0
         self.alive_fraction = 0
-        self.datacollector = DataCollector(
-            model_reporters={"Cells alive": "alive_count",
-                             "Fraction alive": "alive_fraction"}
-        )
+        self.active_tiles = 0
+        model_reporters = {"Cells alive": "alive_count",
+                           "Fraction alive": "alive_fraction"}
+        if engine == "tiled":
+            model_reporters["Active tiles"] = "active_tiles"
+        self.datacollector = DataCollector(model_reporters=model_reporters)
         self.datacollector.collect(self)
 
     def step(self):
+        if self.engine == "hashlife":
+            self.cell_layer.advance(self.step_exponent)
+            self.generation += 2**self.step_exponent
+            self.alive_count = self.cell_layer.count()
+            self.alive_fraction = self.alive_count / self.cells
+            self.datacollector.collect(self)
+            return
+
+        self.generation += 1
+        if self.engine == "bitpacked":
+            self.cell_layer.step()
+            self.alive_count = self.cell_layer.count()
+            self.alive_fraction = self.alive_count / self.cells
+            self.datacollector.collect(self)
+            return
+        if self.engine == "striped":
+            self.cell_layer.data, self.alive_count = self.stepper.step(self.cell_layer.data)
+            self.alive_fraction = self.alive_count / self.cells
+            self.datacollector.collect(self)
+            return
+        if self.engine == "tiled":
+            self.scheduler.step(self.cell_layer.data)
+            self.active_tiles = self.scheduler.active_tiles
+            self.alive_count = self.scheduler.alive_count
+            self.alive_fraction = self.alive_count / self.cells
+            self.datacollector.collect(self)
+            return
+
         # Define a kernel for counting neighbors. The kernel has 1s around the center cell (which is 0).
         # This setup allows us to count the live neighbors of each cell when we apply convolution.
         kernel = np.array([[1, 1, 1],
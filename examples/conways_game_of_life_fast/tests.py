@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from model import GameOfLifeModel
+
+# Sizes that do not fit the engines' words and tiles evenly
+SIZES = [(37, 130), (5, 3), (100, 65)]
+
+
+def run(width, height, steps, **kwargs):
+    # The same np.random seed gives every engine the same initial cells
+    np.random.seed(42)
+    model = GameOfLifeModel(width, height, alive_fraction=0.3, **kwargs)
+    for _ in range(steps):
+        model.step()
+    return model
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"engine": "bitpacked"},
+        {"engine": "tiled", "tile_size": 16},
+        {"engine": "striped", "num_threads": 4},
+    ],
+)
+@pytest.mark.parametrize(("width", "height"), SIZES)
+def test_engine_matches_convolve(kwargs, width, height):
+    expected = run(width, height, 10)
+    model = run(width, height, 10, **kwargs)
+    assert (model.cell_layer.data == expected.cell_layer.data).all()
+    assert model.alive_count == expected.alive_count
+
+
+def test_tiled_engine_skips_quiet_tiles():
+    # A glider crossing the edges and a block, on an otherwise empty board
+    cells = np.zeros((70, 45), dtype=bool)
+    cells[[1, 2, 3, 3, 3], [2, 3, 1, 2, 3]] = True
+    cells[40:42, 20:22] = True
+    expected = GameOfLifeModel(70, 45, alive_fraction=0)
+    expected.cell_layer.data = cells.copy()
+    model = GameOfLifeModel(70, 45, alive_fraction=0, engine="tiled", tile_size=8)
+    model.cell_layer.data = cells.copy()
+    model.scheduler.activate_all(model.cell_layer.data)
+    for _ in range(200):
+        expected.step()
+        model.step()
+        assert (model.cell_layer.data == expected.cell_layer.data).all()
+    assert model.alive_count == expected.alive_count == 9
+    assert model.active_tiles < model.scheduler.changed.size / 4
+
+
+@pytest.mark.parametrize("step_exponent", [0, 1, 3])
+@pytest.mark.parametrize(("width", "height"), [(16, 64), (8, 4), (32, 32)])
+def test_hashlife_matches_convolve(step_exponent, width, height):
+    expected = run(width, height, 3 * 2**step_exponent)
+    model = run(width, height, 3, engine="hashlife", step_exponent=step_exponent)
+    assert model.generation == expected.generation
+    assert (model.cell_layer.data == expected.cell_layer.data).all()
+    assert model.alive_count == expected.alive_count
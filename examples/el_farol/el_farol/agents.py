@@ -26,15 +26,15 @@ class BarCustomer(mesa.Agent):
 
     def update_strategies(self):
         # Pick the best strategy based on new history window
+        # Views on the history: each window of weeks, and the week after it
+        windows = self.model.history.windows(self.memory_size)
+        targets = self.model.history[self.memory_size :]
         best_score = float("inf")
         for strategy in self.strategies:
             score = 0
             for week in range(self.memory_size):
-                last = week + self.memory_size
-                prediction = self.predict_attendance(
-                    strategy, self.model.history[week:last]
-                )
-                score += abs(self.model.history[last] - prediction)
+                prediction = self.predict_attendance(strategy, windows[week])
+                score += abs(targets[week] - prediction)
             if score <= best_score:
                 best_score = score
                 self.best_strategy = strategy
@@ -61,3 +61,33 @@ class BarCustomer(mesa.Agent):
         # of the bar's attendance in the absence of any other data then we
         # multiply each week in the history by its respective weight.
         return strategy[0] * 100 + np.dot(strategy[1:], subhistory)
+
+
+def _customer_column(name):
+    def get(self):
+        return getattr(self.model, name)[self.index].item()
+
+    return property(get)
+
+
+class ArrayCustomer(mesa.Agent):
+    """A BarCustomer whose state is row ``index`` of the model's arrays.
+
+    Used by the "arrays" engine of ElFarolBar, which decides for all customers at once
+    (see vectorized.py); the attributes are read-only views for the DataCollector.
+    """
+
+    attend = _customer_column("attend")
+    utility = _customer_column("utility")
+
+    def __init__(self, model, index):
+        super().__init__(model)
+        self.index = index
+
+    @property
+    def strategies(self):
+        return self.model.strategies[self.index]
+
+    @property
+    def best_strategy(self):
+        return self.strategies[self.model.best[self.index]]
@@ -1,42 +1,128 @@
 import mesa
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
-from .agents import BarCustomer
+from . import vectorized
+from .agents import ArrayCustomer, BarCustomer
+
+
+class AttendanceHistory:
+    """The attendance of the last weeks, in a fixed-size NumPy ring buffer.
+
+    Every week is stored twice, at ``i`` and ``i + length``, so the history in order,
+    oldest week first, is always one contiguous slice of the buffer. Reading it, a
+    part of it or all its sliding windows gives views, never copies.
+    """
+
+    def __init__(self, attendance):
+        self.length = len(attendance)
+        self._buffer = np.empty(2 * self.length)
+        self._buffer[: self.length] = self._buffer[self.length :] = attendance
+        self._start = 0
+
+    def append(self, attendance):
+        """Add this week's attendance, forgetting the oldest week."""
+        self._buffer[self._start] = self._buffer[self._start + self.length] = attendance
+        self._start = (self._start + 1) % self.length
+
+    @property
+    def values(self):
+        """The attendance of every week, oldest first (a view)."""
+        return self._buffer[self._start : self._start + self.length]
+
+    def windows(self, size):
+        """All runs of ``size`` consecutive weeks, oldest first (a view)."""
+        return sliding_window_view(self.values, size)
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def __len__(self):
+        return self.length
 
 
 class ElFarolBar(mesa.Model):
+    """The El Farol bar problem.
+
+    With engine="arrays" the strategies, choices and utilities of all customers are
+    kept in NumPy arrays and scored for everybody at once (see vectorized.py), which
+    makes runs with 100k customers feasible. The customers are then ArrayCustomer
+    views on these arrays. Given the same np.random seed, both engines give the same
+    runs.
+    """
+
     def __init__(
         self,
         crowd_threshold=60,
         num_strategies=10,
         memory_size=10,
         num_agents=100,
+        engine="agents",
     ):
         super().__init__()
+        if engine not in ("agents", "arrays"):
+            raise ValueError(f"Unknown engine: {engine!r}")
         self.running = True
         self.num_agents = num_agents
+        self.engine = engine
 
         # Initialize the previous attendance randomly so the agents have a history
         # to work with from the start.
         # The history is twice the memory, because we need at least a memory
         # worth of history for each point in memory to test how well the
         # strategies would have worked.
-        self.history = np.random.randint(0, 100, size=memory_size * 2).tolist()
-        self.attendance = self.history[-1]
-        for _ in range(self.num_agents):
-            BarCustomer(self, memory_size, crowd_threshold, num_strategies)
+        self.history = AttendanceHistory(
+            np.random.randint(0, 100, size=memory_size * 2)
+        )
+        self.attendance = int(self.history[-1])
+        if self.engine == "arrays":
+            self.crowd_threshold = crowd_threshold
+            # Drawn in the same order as by the BarCustomers, one after the other
+            self.strategies = (
+                np.random.rand(num_agents, num_strategies, memory_size + 1) * 2 - 1
+            )
+            self.best = np.zeros(num_agents, dtype=np.int64)
+            self.attend = np.zeros(num_agents, dtype=bool)
+            self.utility = np.zeros(num_agents, dtype=np.int64)
+            self.update_strategies()
+            for i in range(self.num_agents):
+                ArrayCustomer(self, i)
+        else:
+            for _ in range(self.num_agents):
+                BarCustomer(self, memory_size, crowd_threshold, num_strategies)
 
         self.datacollector = mesa.DataCollector(
             model_reporters={"Customers": "attendance"},
             agent_reporters={"Utility": "utility", "Attendance": "attend"},
         )
 
+    def update_strategies(self):
+        """Let every customer pick their best strategy (arrays engine)."""
+        memory_size = self.strategies.shape[-1] - 1
+        self.best = vectorized.best_strategies(
+            self.strategies,
+            self.history.windows(memory_size)[:memory_size],
+            self.history[memory_size:],
+        )
+        should_attend = self.history[-1] <= self.crowd_threshold
+        self.utility += np.where(self.attend != should_attend, -1, 1)
+
     def step(self):
         self.datacollector.collect(self)
-        self.attendance = 0
-        self.agents.shuffle_do("update_attendance")
-        # We ensure that the length of history is constant
-        # after each step.
-        self.history.pop(0)
+        if self.engine == "arrays":
+            self.attend = vectorized.attend(
+                self.strategies,
+                self.best,
+                self.history[-(self.strategies.shape[-1] - 1) :],
+                self.crowd_threshold,
+            )
+            self.attendance = int(self.attend.sum())
+        else:
+            self.attendance = 0
+            self.agents.shuffle_do("update_attendance")
+        # The history keeps its length, the oldest week is dropped
         self.history.append(self.attendance)
-        self.agents.shuffle_do("update_strategies")
+        if self.engine == "arrays":
+            self.update_strategies()
+        else:
+            self.agents.shuffle_do("update_strategies")
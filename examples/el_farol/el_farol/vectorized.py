@@ -0,0 +1,47 @@
+"""Array version of the customers' decisions, for runs with many customers.
+
+The strategies of all customers are one (customers, strategies, memory_size + 1)
+array. Every strategy is scored against all windows of the history with one matrix
+product, instead of one ``np.dot`` per customer, strategy and week.
+"""
+
+import numpy as np
+
+
+def predict(strategies, windows):
+    """Predicted attendance, see BarCustomer.predict_attendance.
+
+    Args:
+        strategies: Array of shape (..., memory_size + 1)
+        windows: Past attendance, shape (weeks, memory_size), oldest week first
+
+    Returns:
+        np.ndarray: The prediction of every strategy for every window, (..., weeks)
+    """
+    return strategies[..., :1] * 100 + strategies[..., 1:] @ windows.T
+
+
+def best_strategies(strategies, windows, targets):
+    """Index of the best strategy of every customer, like BarCustomer.update_strategies.
+
+    A strategy's score is its total absolute error in predicting the attendance of
+    each of the ``targets`` weeks from the window of weeks before it.
+
+    Args:
+        strategies: Array of shape (customers, strategies, memory_size + 1)
+        windows: Past attendance, shape (weeks, memory_size), oldest week first
+        targets: The attendance in the week after each window, shape (weeks,)
+    """
+    scores = np.abs(targets - predict(strategies, windows)).sum(axis=-1)
+    # As in BarCustomer, the last of equally good strategies wins
+    num_strategies = strategies.shape[1]
+    return num_strategies - 1 - np.argmin(scores[:, ::-1], axis=1)
+
+
+def attend(strategies, best, recent, crowd_threshold):
+    """Whether every customer goes to the bar, like BarCustomer.update_attendance.
+
+    ``recent`` is the attendance of the last memory_size weeks, oldest first.
+    """
+    chosen = strategies[np.arange(len(best)), best]
+    return predict(chosen, recent[None])[:, 0] <= crowd_threshold
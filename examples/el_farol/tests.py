@@ -17,3 +17,20 @@ def test_convergence():
     standard_deviation = np.std(attendances)
     deviation = abs(mean - crowd_threshold)
     assert deviation < standard_deviation
+
+
+def test_arrays_engine():
+    # Testing that the arrays engine makes the same choices as the agents
+    np.random.seed(2)
+    agents_model = ElFarolBar(crowd_threshold=crowd_threshold, memory_size=5)
+    np.random.seed(2)
+    arrays_model = ElFarolBar(
+        crowd_threshold=crowd_threshold, memory_size=5, engine="arrays"
+    )
+    for _ in range(50):
+        agents_model.step()
+        arrays_model.step()
+    assert (agents_model.history.values == arrays_model.history.values).all()
+    assert [a.utility for a in agents_model.agents] == [
+        a.utility for a in arrays_model.agents
+    ]
@@ -1,5 +1,7 @@
 from mesa.discrete_space import FixedAgent
 
+from .vectorized import CONDITIONS
+
 
 class TreeCell(FixedAgent):
     """A tree cell.
@@ -22,7 +24,34 @@ class TreeCell(FixedAgent):
     def step(self):
         """If the tree is on fire, spread it to fine trees nearby."""
         if self.condition == "On Fire":
-            for neighbor in self.cell.neighborhood.agents:
-                if neighbor.condition == "Fine":
-                    neighbor.condition = "On Fire"
+            self.ignite_neighbors()
             self.condition = "Burned Out"
+
+    def ignite_neighbors(self):
+        """Set the fine trees nearby on fire.
+
+        Returns:
+            list[TreeCell]: The trees that caught fire
+        """
+        ignited = []
+        for neighbor in self.cell.neighborhood.agents:
+            if neighbor.condition == "Fine":
+                neighbor.condition = "On Fire"
+                ignited.append(neighbor)
+        return ignited
+
+
+class ArrayTreeCell(FixedAgent):
+    """A view of a tree of a ForestFire with engine="arrays", for visualization.
+
+    The condition is read from the model's ``conditions`` array.
+    """
+
+    def __init__(self, model, cell):
+        super().__init__(model)
+        self.cell = cell
+
+    @property
+    def condition(self):
+        x, y = self.cell.coordinate
+        return CONDITIONS[self.model.conditions[x, y]]
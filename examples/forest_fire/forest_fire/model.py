@@ -1,24 +1,59 @@
+import heapq
+
 import mesa
 from mesa.discrete_space import OrthogonalMooreGrid
 
-from .agent import TreeCell
+from . import vectorized
+from .agent import ArrayTreeCell, TreeCell
 
 
 class ForestFire(mesa.Model):
-    """Simple Forest Fire model."""
+    """Simple Forest Fire model.
+
+    With engine="frontier" only the trees that are on fire are stepped, and the number
+    of trees in each condition is kept up to date as the fire spreads, so a step costs
+    time in proportion to the fire front instead of the forest. The trees are still
+    activated in a random order, drawn lazily: a tree that catches fire acts in the
+    same step if it comes after the tree that set it on fire, as with shuffle_do, so
+    both engines give statistically the same fires.
+
+    With engine="arrays" the conditions are a uint8 array and the fire spreads by
+    whole-forest array operations (see vectorized.py), which handles forests of
+    10,000 x 10,000 cells. All neighbors of burning trees catch fire at once, so the
+    fire front advances one cell per step, while the final burned area is the same as
+    with the other engines. The trees are ArrayTreeCell views for visualization, which
+    can be left out with tree_views=False; then there is no grid either.
+    """
 
-    def __init__(self, width=100, height=100, density=0.65, seed=None):
+    def __init__(
+        self,
+        width=100,
+        height=100,
+        density=0.65,
+        seed=None,
+        engine="agents",
+        tree_views=True,
+    ):
         """Create a new forest fire model.
 
         Args:
             width, height: The size of the grid to model
             density: What fraction of grid cells have a tree in them.
+            engine: "agents" to step every tree, "frontier" to step only the fire,
+                "arrays" to step the whole forest as arrays
+            tree_views: Create agents and a grid with the "arrays" engine
         """
         super().__init__(seed=seed)
+        if engine not in ("agents", "frontier", "arrays"):
+            raise ValueError(f"Unknown engine: {engine!r}")
+        self.engine = engine
 
         # Set up model objects
 
-        self.grid = OrthogonalMooreGrid((width, height), capacity=1, random=self.random)
+        if engine != "arrays" or tree_views:
+            self.grid = OrthogonalMooreGrid(
+                (width, height), capacity=1, random=self.random
+            )
         self.datacollector = mesa.DataCollector(
             {
                 "Fine": lambda m: self.count_type(m, "Fine"),
@@ -27,6 +62,16 @@ class ForestFire(mesa.Model):
             }
         )
 
+        if self.engine == "arrays":
+            self.conditions = vectorized.plant(self.rng, width, height, density)
+            self.condition_counts = vectorized.count(self.conditions)
+            if tree_views:
+                for x, y in zip(*self.conditions.nonzero()):
+                    ArrayTreeCell(self, self.grid[(int(x), int(y))])
+            self.running = True
+            self.datacollector.collect(self)
+            return
+
         # Place a tree in each cell with Prob = density
         for cell in self.grid.all_cells:
             if self.random.random() < density:
@@ -36,12 +81,25 @@ class ForestFire(mesa.Model):
                 if cell.coordinate[0] == 0:
                     new_tree.condition = "On Fire"
 
+        if self.engine == "frontier":
+            self.burning = [t for t in self.agents if t.condition == "On Fire"]
+            self.condition_counts = {
+                "Fine": len(self.agents) - len(self.burning),
+                "On Fire": len(self.burning),
+                "Burned Out": 0,
+            }
+
         self.running = True
         self.datacollector.collect(self)
 
     def step(self):
         """Advance the model by one step."""
-        self.agents.shuffle_do("step")
+        if self.engine == "frontier":
+            self.spread_fire()
+        elif self.engine == "arrays":
+            vectorized.spread_fire(self.conditions, self.condition_counts)
+        else:
+            self.agents.shuffle_do("step")
         # collect data
         self.datacollector.collect(self)
 
@@ -49,7 +107,36 @@ class ForestFire(mesa.Model):
         if self.count_type(self, "On Fire") == 0:
             self.running = False
 
+    def spread_fire(self):
+        """Let the trees on fire spread it and burn out (frontier engine).
+
+        Every burning tree gets a random position in the step's activation order. The
+        trees it sets on fire get one too, and act in this step if it is later.
+        """
+        order = [(self.random.random(), t.unique_id, t) for t in self.burning]
+        heapq.heapify(order)
+        next_burning = []
+        counts = self.condition_counts
+        while order:
+            position, _, tree = heapq.heappop(order)
+            for neighbor in tree.ignite_neighbors():
+                counts["Fine"] -= 1
+                counts["On Fire"] += 1
+                neighbor_position = self.random.random()
+                if neighbor_position > position:
+                    heapq.heappush(
+                        order, (neighbor_position, neighbor.unique_id, neighbor)
+                    )
+                else:
+                    next_burning.append(neighbor)
+            tree.condition = "Burned Out"
+            counts["On Fire"] -= 1
+            counts["Burned Out"] += 1
+        self.burning = next_burning
+
     @staticmethod
     def count_type(model, tree_condition):
         """Helper method to count trees in a given condition in a given model."""
+        if model.engine in ("frontier", "arrays"):
+            return model.condition_counts[tree_condition]
         return len(model.agents.select(lambda x: x.condition == tree_condition))
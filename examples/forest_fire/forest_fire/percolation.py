@@ -0,0 +1,181 @@
+"""Sweeps of the forest fire over tree densities, to find the percolation threshold.
+
+A run either steps a ForestFire (with the "arrays" engine) until the fire dies, or
+takes the analytical shortcut: the fire burns exactly the clusters of neighboring
+trees (Moore neighborhood) that contain a tree of the first column. Labelling the
+clusters with a union-find answers whether the fire reaches the far edge and how much
+of the forest burns, without stepping.
+"""
+
+import itertools
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+from tqdm.auto import tqdm
+
+from .model import ForestFire
+from .vectorized import BURNED_OUT
+
+# Offsets to the neighbors that come later in the array, so every pair is seen once
+FORWARD = ((0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def plant_forest(width, height, density, seed):
+    """The trees of the ForestFire with these parameters, as a bool array."""
+    model = ForestFire(width, height, density, seed, engine="arrays", tree_views=False)
+    return model.conditions > 0
+
+
+def _pairs(trees, dx, dy):
+    """Flat indices of the trees at (x, y) and (x + dx, y + dy), for all such pairs."""
+    width, height = trees.shape
+    index = np.arange(trees.size, dtype=np.int64).reshape(trees.shape)
+    columns = slice(max(0, -dy), height - max(0, dy))
+    shifted = slice(max(0, dy), height - max(0, -dy))
+    source, target = index[: width - dx, columns], index[dx:, shifted]
+    both = trees[: width - dx, columns] & trees[dx:, shifted]
+    return source[both], target[both]
+
+
+def label_clusters(trees):
+    """Union-find over all neighboring trees at once.
+
+    Every round, the roots of the two ends of every pair that is not yet in one
+    cluster are linked, the larger root under the smaller, and the paths are then
+    compressed by pointer jumping until every cell points at its root.
+
+    Returns:
+        np.ndarray: The root (a flat index) of the cluster of every cell, same shape
+        as ``trees``; cells without a tree are their own root.
+    """
+    parent = np.arange(trees.size, dtype=np.int64)
+    for dx, dy in FORWARD:
+        a, b = _pairs(trees, dx, dy)
+        while len(a):
+            root_a, root_b = parent[a], parent[b]
+            apart = root_a != root_b
+            a, b, root_a, root_b = a[apart], b[apart], root_a[apart], root_b[apart]
+            np.minimum.at(
+                parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b)
+            )
+            while True:
+                grandparent = parent[parent]
+                if np.array_equal(grandparent, parent):
+                    break
+                parent = grandparent
+    return parent.reshape(trees.shape)
+
+
+def predict_fire(trees):
+    """How the fire ends, from the clusters of the trees.
+
+    Returns:
+        tuple[bool, float]: Whether the fire reaches the last column, and the
+        fraction of the trees that burn
+    """
+    roots = label_clusters(trees)
+    burning = np.unique(roots[0][trees[0]])
+    burned = np.isin(roots, burning) & trees
+    return bool(burned[-1].any()), _fraction(burned, trees)
+
+
+def simulate_fire(width, height, density, seed):
+    """How the fire ends, by stepping the ForestFire until the fire dies."""
+    model = ForestFire(width, height, density, seed, engine="arrays", tree_views=False)
+    while model.running:
+        model.step()
+    burned = model.conditions == BURNED_OUT
+    return bool(burned[-1].any()), _fraction(burned, model.conditions > 0)
+
+
+def _fraction(burned, trees):
+    num_trees = np.count_nonzero(trees)
+    return float(np.count_nonzero(burned) / num_trees) if num_trees else 0.0
+
+
+def _run(args):
+    width, height, density, seed, simulate = args
+    if simulate:
+        reaches, burned = simulate_fire(width, height, density, seed)
+    else:
+        reaches, burned = predict_fire(plant_forest(width, height, density, seed))
+    return {
+        "density": density,
+        "seed": seed,
+        "reaches_far_edge": reaches,
+        "burned_fraction": burned,
+    }
+
+
+def _check(width, height, runs, validate, number_processes):
+    """Compare the shortcut with the stepped model on ``validate`` evenly spread runs."""
+    sample = runs[:: max(1, len(runs) // validate)][:validate]
+    tasks = [(width, height, density, seed, True) for density, seed in sample]
+    with mp.Pool(number_processes) as pool:
+        simulated = pool.map(_run, tasks)
+    for row in simulated:
+        predicted = _run((width, height, row["density"], row["seed"], False))
+        if predicted != row:
+            raise RuntimeError(
+                f"Union-find result {predicted} differs from the model run {row}"
+            )
+
+
+def run_sweep(
+    densities,
+    seeds,
+    width=100,
+    height=100,
+    simulate=False,
+    validate=5,
+    number_processes=None,
+    display_progress=True,
+):
+    """Run the forest fire for every density and seed, in a process pool.
+
+    Args:
+        densities: Tree densities to run
+        seeds: Seeds to run every density with
+        width, height: Size of the forests
+        simulate: Step every model instead of using the union-find shortcut
+        validate: Number of runs that are also stepped to check the shortcut; a
+            RuntimeError is raised if they disagree
+        number_processes: Size of the process pool, the number of CPUs if None
+        display_progress: Show a progress bar
+
+    Returns:
+        pd.DataFrame: One row per run, with the density, seed, whether the fire
+        reached the far edge and the fraction of the trees that burned
+    """
+    runs = list(itertools.product(densities, seeds))
+    if validate and not simulate:
+        _check(width, height, runs, validate, number_processes)
+
+    tasks = [(width, height, density, seed, simulate) for density, seed in runs]
+    with mp.Pool(number_processes) as pool:
+        rows = list(
+            tqdm(
+                pool.imap_unordered(_run, tasks),
+                total=len(tasks),
+                disable=not display_progress,
+            )
+        )
+    return pd.DataFrame(rows).sort_values(["density", "seed"], ignore_index=True)
+
+
+def estimate_threshold(results):
+    """The density at which half of the fires reach the far edge.
+
+    Interpolated linearly between the densities of a sweep's results.
+    """
+    reached = results.groupby("density")["reaches_far_edge"].mean()
+    above = np.flatnonzero(reached.to_numpy() >= 0.5)
+    if len(above) == 0:
+        return np.nan
+    i = above[0]
+    if i == 0:
+        return float(reached.index[0])
+    d0, d1 = reached.index[i - 1], reached.index[i]
+    p0, p1 = reached.iloc[i - 1], reached.iloc[i]
+    return float(d0 + (0.5 - p0) * (d1 - d0) / (p1 - p0))
@@ -0,0 +1,50 @@
+"""Array version of the forest fire, for forests of many millions of trees.
+
+The condition of every cell is one uint8 in a (width, height) array. A step sets on
+fire every fine tree in the Moore neighborhood of a burning tree at once (a dilation
+of the burning cells), and burns out the trees that were on fire.
+"""
+
+import numpy as np
+
+EMPTY = 0
+FINE = 1
+ON_FIRE = 2
+BURNED_OUT = 3
+
+CONDITIONS = {FINE: "Fine", ON_FIRE: "On Fire", BURNED_OUT: "Burned Out"}
+
+
+def plant(rng, width, height, density):
+    """A forest with a tree in each cell with probability ``density``, and the trees
+    in the first column on fire."""
+    conditions = (rng.random((width, height)) < density).view(np.uint8)
+    conditions[0][conditions[0] == FINE] = ON_FIRE
+    return conditions
+
+
+def count(conditions):
+    """Number of trees in each condition, by name."""
+    counts = np.bincount(conditions.ravel(), minlength=len(CONDITIONS) + 1)
+    return {name: int(counts[value]) for value, name in CONDITIONS.items()}
+
+
+def spread_fire(conditions, counts):
+    """Advance the fire by one step, updating ``conditions`` and ``counts`` in place."""
+    burning = conditions == ON_FIRE
+    # Moore neighborhood of the burning cells: a 3 x 3 dilation, one axis at a time
+    exposed = burning.copy()
+    exposed[1:] |= burning[:-1]
+    exposed[:-1] |= burning[1:]
+    rows = exposed.copy()
+    exposed[:, 1:] |= rows[:, :-1]
+    exposed[:, :-1] |= rows[:, 1:]
+    exposed &= conditions == FINE
+
+    conditions[burning] = BURNED_OUT
+    conditions[exposed] = ON_FIRE
+    burned_out = int(np.count_nonzero(burning))
+    ignited = int(np.count_nonzero(exposed))
+    counts["Fine"] -= ignited
+    counts["On Fire"] = ignited
+    counts["Burned Out"] += burned_out
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+from forest_fire.model import ForestFire
+from forest_fire.percolation import predict_fire
+
+
+@pytest.mark.parametrize("engine", ["agents", "frontier"])
+@pytest.mark.parametrize("seed", [0, 1, 5])
+def test_union_find_predicts_the_fire(engine, seed):
+    # Close to the percolation threshold, so some fires stop halfway
+    model = ForestFire(40, 30, density=0.4, seed=seed, engine=engine)
+    trees = np.zeros((40, 30), dtype=bool)
+    for tree in model.agents:
+        trees[tree.cell.coordinate] = True
+    reaches_far_edge, burned_fraction = predict_fire(trees)
+
+    while model.running:
+        model.step()
+    burned = [tree for tree in model.agents if tree.condition == "Burned Out"]
+    assert round(burned_fraction * trees.sum()) == len(burned)
+    assert reaches_far_edge == any(tree.cell.coordinate[0] == 39 for tree in burned)